@@ -25,6 +25,7 @@ struct AppState
     // WiFi and connections
     bool wifiConnected = false;
     bool pcConnected = false;
+    bool wsMsgPack = false; // backend согласовал MessagePack для команд
     bool isFirstBoot = true;
     bool isDataLoading = false;
 
@@ -76,6 +77,9 @@ struct AppState
     size_t animFrameSize = 0;
     size_t animTotalSize = 0;
     size_t animReceivedBytes = 0;
+    bool animAckEnabled = false; // backend просит подтверждать смещения (gif_ack)
+    String animTransferId;       // id передачи для докачки после обрыва
+    String animHash;             // хэш содержимого от backend
     int animDelay = 100; // Задержка между кадрами (мс)
 
     // Song overlay
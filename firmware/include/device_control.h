@@ -12,5 +12,6 @@ void updateConnectionStatus();
 void updateAutoBrightness();
 void updateSleepMode();
 void triggerSleepScreenPreview(unsigned long durationMs = 5000);
+bool isScreenAsleep();
 
 #endif
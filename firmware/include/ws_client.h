@@ -6,6 +6,8 @@
 void initWebSocketClient();
 void updateWebSocketClient();
 void sendWebSocketMessage(const String &message);
+void sendGifAck(size_t offset);
+void sendInterestState();
 bool isWebSocketConnected();
 void reconnectWebSocket();
 void forceWebSocketReconnect();
@@ -5,6 +5,7 @@
 #include <ArduinoJson.h>
 
 void processWebSocketMessage(const String &message);
+void processMsgPackMessage(const uint8_t *payload, size_t length);
 void processJSONCommand(JsonDocument &doc);
 void handleVolumeCommand(int volume);
 void handleBusScheduleCommand(JsonObject doc);
@@ -14,6 +15,8 @@ void handleSettingsCommand(JsonDocument &doc);
 void handleLedStateCommand(JsonDocument &doc);
 void handleOtaCommand(JsonDocument &doc);
 void handleGifCommand(JsonDocument &doc);
+void updateGifPull();
+void abortGifPull();
 void applySavedUiColors();
 
 #endif
@@ -4,6 +4,7 @@
 #include <ui.h>
 #include <FastLED.h>
 #include "led_effects.h"
+#include "ws_client.h"
 #include <Arduino.h>
 
 #define BUZZER_PIN 8
@@ -183,6 +184,13 @@ void triggerSleepScreenPreview(unsigned long durationMs)
     sleepScreenPreviewUntil = millis() + durationMs;
     ledcWrite(0, appState.screenBrightness);
     Serial.printf("[Sleep] Screen preview for %lu ms\n", durationMs);
+    sendInterestState();
+}
+
+bool isScreenAsleep()
+{
+    // Во время превью экран светится, хотя режим сна не закончился
+    return appState.isSleepingNow && !sleepScreenPreviewActive;
 }
 
 void updateSleepMode()
@@ -194,6 +202,7 @@ void updateSleepMode()
             ledcWrite(0, 0);
             sleepScreenPreviewActive = false;
             Serial.println("[Sleep] Screen preview ended");
+            sendInterestState();
         }
     }
 
@@ -206,6 +215,7 @@ void updateSleepMode()
             sleepScreenPreviewActive = false;
             setScreenBrightness(appState.screenBrightness);
             setLedBrightness(appState.ledBrightness);
+            sendInterestState();
         }
         return;
     }
@@ -242,6 +252,7 @@ void updateSleepMode()
         ledcWrite(0, 0); // гасим экран напрямую
         FastLED.setBrightness(0);
         FastLED.show();
+        sendInterestState();
     }
     else if (!shouldSleep && appState.isSleepingNow)
     {
@@ -251,5 +262,6 @@ void updateSleepMode()
 
         setScreenBrightness(appState.screenBrightness);
         setLedBrightness(appState.ledBrightness);
+        sendInterestState();
     }
 }
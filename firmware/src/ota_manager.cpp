@@ -76,12 +76,22 @@ namespace
         lastProgress = -1;
     }
 
-    void scheduleRetry(const String &reason)
+    // keepProgress: only the connection failed, so the bytes already written
+    // stay in the Update partition and the next attempt asks for the rest.
+    void scheduleRetry(const String &reason, bool keepProgress = false)
     {
-        resetInternalState();
+        if (keepProgress && Update.isRunning() && writtenLength > 0)
+        {
+            stopHttp();
+        }
+        else
+        {
+            resetInternalState();
+        }
 
         if (retryCount >= OTA_MAX_RETRIES)
         {
+            resetInternalState();
             emitEvent(lastProgress < 0 ? 0 : lastProgress, "error", "max retries reached: " + reason);
             otaState = OtaState::IDLE;
             return;
@@ -161,7 +171,7 @@ void updateOtaManager()
     {
         if (!appState.wifiConnected)
         {
-            scheduleRetry("wifi disconnected");
+            scheduleRetry("wifi disconnected", true);
             return;
         }
 
@@ -184,15 +194,42 @@ void updateOtaManager()
 
         if (!beginOk)
         {
-            scheduleRetry("http.begin failed");
+            scheduleRetry("http.begin failed", true);
             return;
         }
         httpStarted = true;
 
+        bool resuming = Update.isRunning() && writtenLength > 0 && writtenLength < expectedLength;
+        if (resuming)
+        {
+            http.addHeader("Range", "bytes=" + String(writtenLength) + "-");
+        }
+
         int httpCode = http.GET();
+        if (resuming && httpCode == HTTP_CODE_PARTIAL_CONTENT)
+        {
+            if (http.getSize() != static_cast<int>(expectedLength - writtenLength))
+            {
+                scheduleRetry("resume size mismatch");
+                return;
+            }
+
+            lastDataAt = millis();
+            emitEvent(lastProgress < 0 ? 0 : lastProgress, "downloading", "resumed at " + String(writtenLength));
+            otaState = OtaState::STREAMING;
+            return;
+        }
+
+        if (resuming && httpCode == HTTP_CODE_OK)
+        {
+            // Server ignored Range: flash the image again from the start.
+            abortUpdateIfRunning();
+            writtenLength = 0;
+        }
+
         if (httpCode != HTTP_CODE_OK)
         {
-            scheduleRetry("HTTP status " + String(httpCode));
+            scheduleRetry("HTTP status " + String(httpCode), true);
             return;
         }
 
@@ -234,14 +271,14 @@ void updateOtaManager()
     {
         if (!appState.wifiConnected)
         {
-            scheduleRetry("wifi lost during OTA");
+            scheduleRetry("wifi lost during OTA", true);
             return;
         }
 
         WiFiClient *stream = http.getStreamPtr();
         if (!stream)
         {
-            scheduleRetry("invalid stream");
+            scheduleRetry("invalid stream", true);
             return;
         }
 
@@ -285,13 +322,13 @@ void updateOtaManager()
 
             if (!stream->connected())
             {
-                scheduleRetry("connection closed before completion");
+                scheduleRetry("connection closed before completion", true);
                 return;
             }
 
             if (millis() - lastDataAt > OTA_STREAM_TIMEOUT_MS)
             {
-                scheduleRetry("stream timeout");
+                scheduleRetry("stream timeout", true);
                 return;
             }
         }
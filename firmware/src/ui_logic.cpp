@@ -148,6 +148,8 @@ void switchScreen(ScreenID screen, bool reverse)
         sendWebSocketMessage("{\"type\":\"pc_load\",\"action\":\"stop\"}");
         pcLoadData.active = false;
     }
+
+    sendInterestState();
 }
 
 // --- ОБРАБОТКА НАЖАТИЙ (ЖЕЛЕЗНАЯ ЛОГИКА) ---
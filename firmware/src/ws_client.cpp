@@ -153,8 +153,16 @@ void onWebSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     switch (type)
     {
     case WStype_DISCONNECTED:
+        // Без WS некому сообщить gif_ready, backend уже считает загрузку сорванной
+        abortGifPull();
+        if (appState.animReceiving && animFile)
+        {
+            // Файл остается открытым для докачки, но принятое уже должно лежать на FS
+            animFile.flush();
+        }
         wsConnecting = false;
         appState.pcConnected = false;
+        appState.wsMsgPack = false;
         appState.isDataLoading = false;
         wsCooldownUntil = millis() + WS_RETRY_COOLDOWN;
         updateConnectionStatus();
@@ -178,11 +186,15 @@ void onWebSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     case WStype_CONNECTED:
         wsConnecting = false;
         appState.pcConnected = true;
+        appState.wsMsgPack = false;
         appState.isDataLoading = false;
         wsCooldownUntil = 0;
         updateConnectionStatus();
         Serial.println("[WS] Connected");
         setDiscoveryListening(false);
+        // Сообщаем backend, какие расширения протокола понимает прошивка
+        sendWebSocketMessage("{\"type\":\"hello\",\"caps\":[\"batch\",\"msgpack\",\"interest\"]}");
+        sendInterestState();
         break;
 
     case WStype_TEXT:
@@ -199,6 +211,32 @@ void onWebSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     }
 
     case WStype_BIN:
+        if (appState.wsMsgPack)
+        {
+            // После согласования MessagePack данные анимации приходят как bin-значение,
+            // всё остальное - команды
+            size_t header = 0;
+            if (length >= 2 && payload[0] == 0xC4)
+            {
+                header = 2;
+            }
+            else if (length >= 3 && payload[0] == 0xC5)
+            {
+                header = 3;
+            }
+            else if (length >= 5 && payload[0] == 0xC6)
+            {
+                header = 5;
+            }
+
+            if (header == 0)
+            {
+                processMsgPackMessage(payload, length);
+                break;
+            }
+            payload += header;
+            length -= header;
+        }
         if (appState.animReceiving)
         {
             if (animFile)
@@ -218,6 +256,11 @@ void onWebSocketEvent(WStype_t type, uint8_t *payload, size_t length)
                 yield();
             }
 
+            if (appState.animAckEnabled)
+            {
+                sendGifAck(appState.animReceivedBytes);
+            }
+
             if (appState.animReceivedBytes >= appState.animTotalSize)
             {
                 animFile.close();
@@ -271,6 +314,9 @@ void initWebSocketClient()
 
 void updateWebSocketClient()
 {
+    // Порция HTTP-загрузки GIF; между порциями webSocket.loop() успевает ответить на ping
+    updateGifPull();
+
     if (!appState.wifiConnected)
     {
         if (udpListening)
@@ -322,6 +368,30 @@ void sendWebSocketMessage(const String &message)
     }
 }
 
+void sendInterestState()
+{
+    // Backend присылает только то, что может показать текущий экран,
+    // и досылает остальное, когда нужный экран откроется
+    String message = "{\"type\":\"interest\",\"screen\":";
+    message += (int)appState.currentScreen;
+    message += ",\"sleeping\":";
+    message += isScreenAsleep() ? "true" : "false";
+    message += "}";
+    sendWebSocketMessage(message);
+}
+
+void sendGifAck(size_t offset)
+{
+    if (!appState.pcConnected)
+    {
+        return;
+    }
+
+    char buf[64];
+    snprintf(buf, sizeof(buf), "{\"type\":\"gif_ack\",\"offset\":%u}", (unsigned)offset);
+    webSocket.sendTXT(buf);
+}
+
 bool isWebSocketConnected()
 {
     return appState.pcConnected;
@@ -10,6 +10,7 @@
 #include <ArduinoJson.h>
 #include <LittleFS.h>
 #include <HTTPClient.h>
+#include <MD5Builder.h>
 #include <ui.h>
 #include "ws_client.h"
 #include <Preferences.h>
@@ -20,6 +21,22 @@ namespace
 {
     constexpr const char *UI_COLOR_FILE = "/ui_colors.json";
     bool otaCallbackRegistered = false;
+    constexpr unsigned long GIF_PULL_TIMEOUT_MS = 10000;
+    constexpr size_t GIF_PULL_ACK_BYTES = 16384;
+    // Столько читаем за один вызов updateGifPull(), потом отдаём время webSocket.loop()
+    constexpr size_t GIF_PULL_SLICE_BYTES = 8192;
+
+    struct GifPull
+    {
+        bool active = false;
+        HTTPClient http;
+        MD5Builder md5;
+        String url;
+        String expectedMd5;
+        size_t lastAck = 0;
+        unsigned long lastDataAt = 0;
+    };
+    GifPull gifPull;
 
     ScreenID resolveScreen7ReturnScreen()
     {
@@ -257,7 +274,9 @@ namespace
 
 void processWebSocketMessage(const String &message)
 {
-    DynamicJsonDocument doc(2048);
+    // batch-кадры длиннее обычных команд: запас под дерево разбора
+    const size_t capacity = message.length() > 1024 ? message.length() * 2 : 2048;
+    DynamicJsonDocument doc(capacity);
     DeserializationError error = deserializeJson(doc, message);
 
     if (error)
@@ -270,10 +289,46 @@ void processWebSocketMessage(const String &message)
     processJSONCommand(doc);
 }
 
+void processMsgPackMessage(const uint8_t *payload, size_t length)
+{
+    // MessagePack компактнее JSON, но дерево разбора занимает столько же
+    const size_t capacity = length > 512 ? length * 4 : 2048;
+    DynamicJsonDocument doc(capacity);
+    DeserializationError error = deserializeMsgPack(doc, reinterpret_cast<const char *>(payload), length);
+
+    if (error)
+    {
+        Serial.print("[WS] MsgPack parse error: ");
+        Serial.println(error.c_str());
+        return;
+    }
+
+    processJSONCommand(doc);
+}
+
 void processJSONCommand(JsonDocument &doc)
 {
     String type = doc["type"] | "";
 
+    if (type == "hello")
+    {
+        // Ответ backend на наш hello: дальше команды приходят бинарными кадрами
+        String codec = doc["codec"] | "json";
+        appState.wsMsgPack = codec == "msgpack";
+        Serial.printf("[WS] Codec: %s\n", codec.c_str());
+        return;
+    }
+    if (type == "batch")
+    {
+        // Несколько команд в одном кадре: каждая обрабатывается как отдельное сообщение
+        for (JsonObject item : doc["items"].as<JsonArray>())
+        {
+            DynamicJsonDocument itemDoc(measureJson(item) * 2 + 256);
+            itemDoc.set(item);
+            processJSONCommand(itemDoc);
+        }
+        return;
+    }
     if (type == "volume")
     {
         // Достаем значение из глубины: payload -> value
@@ -374,6 +429,8 @@ void processJSONCommand(JsonDocument &doc)
     }
     else if (type == "set_gif")
     {
+        abortGifPull();
+
         // 1. ОСТАНАВЛИВАЕМ ПЛЕЙБЕК, ЧТОБЫ ОСВОБОДИТЬ /anim.bin
         stopAnimation();
 
@@ -390,6 +447,9 @@ void processJSONCommand(JsonDocument &doc)
         appState.animHeight = doc["height"] | 0;
         appState.animTotalSize = doc["total_size"] | 0;
         appState.animDelay = doc["delay"] | 100;
+        appState.animAckEnabled = String(doc["flow"] | "") == "ack";
+        appState.animTransferId = doc["transfer_id"] | "";
+        appState.animHash = doc["hash"] | "";
 
         Preferences prefs;
         prefs.begin("deskhub", false);
@@ -433,10 +493,54 @@ void processJSONCommand(JsonDocument &doc)
             return;
         }
 
+        // Backend дал ссылку на готовый бинарник: качаем его по HTTP сами
+        if (String(doc["url"] | "").length() > 0)
+        {
+            handleGifCommand(doc);
+            return;
+        }
+
         // 3. Включаем режим приема бинарных данных
         appState.animReceiving = true;
         appState.isDataLoading = true;
         updateConnectionStatus();
+
+        // Нулевое смещение: файл открыт, backend может начинать передачу
+        if (appState.animAckEnabled)
+        {
+            sendGifAck(0);
+        }
+    }
+    else if (type == "gif_status")
+    {
+        // Backend спрашивает, сколько байт уже принято, чтобы продолжить после обрыва
+        DynamicJsonDocument response(256);
+        response["type"] = "gif_status";
+        response["transfer_id"] = appState.animTransferId;
+        response["hash"] = appState.animHash;
+        response["offset"] = appState.animReceivedBytes;
+        response["receiving"] = appState.animReceiving && (bool)animFile;
+
+        String out;
+        serializeJson(response, out);
+        sendWebSocketMessage(out);
+    }
+    else if (type == "gif_resume")
+    {
+        String transferId = doc["transfer_id"] | "";
+        size_t offset = doc["offset"] | 0;
+
+        if (!appState.animReceiving || !animFile || transferId != appState.animTransferId ||
+            offset != appState.animReceivedBytes)
+        {
+            Serial.printf("[Anim] Resume rejected: id=%s offset=%u\n", transferId.c_str(), offset);
+            return;
+        }
+
+        Serial.printf("[Anim] Resume at %u / %u bytes\n", appState.animReceivedBytes, appState.animTotalSize);
+        appState.isDataLoading = true;
+        updateConnectionStatus();
+        sendGifAck(appState.animReceivedBytes);
     }
     else if (type == "factory_reset")
     {
@@ -904,50 +1008,156 @@ void handleOtaCommand(JsonDocument &doc)
     requestOtaUpdate(url, md5);
 }
 
+namespace
+{
+    void finishGifPull(const String &error)
+    {
+        gifPull.active = false;
+        gifPull.http.end();
+        animFile.close();
+
+        String failure = error;
+        gifPull.md5.calculate();
+        if (failure.length() == 0 && gifPull.expectedMd5.length() > 0 &&
+            !gifPull.expectedMd5.equalsIgnoreCase(gifPull.md5.toString()))
+        {
+            failure = "md5 mismatch";
+        }
+
+        appState.isDataLoading = false;
+        updateConnectionStatus();
+
+        if (failure.length() > 0)
+        {
+            Serial.println("[Anim] Download failed: " + failure);
+            LittleFS.remove("/anim.bin");
+
+            DynamicJsonDocument response(192);
+            response["type"] = "gif_ready";
+            response["status"] = "error";
+            response["message"] = failure;
+
+            String out;
+            serializeJson(response, out);
+            sendWebSocketMessage(out);
+            return;
+        }
+
+        Serial.printf("[Anim] Downloaded %u bytes from %s\n", appState.animReceivedBytes, gifPull.url.c_str());
+        sendGifAck(appState.animReceivedBytes);
+        startAnimation();
+        sendWebSocketMessage("{\"type\":\"gif_ready\",\"status\":\"success\"}");
+    }
+}
+
 void handleGifCommand(JsonDocument &doc)
 {
+    // set_gif с url: /anim.bin уже открыт, тело приходит по HTTP вместо WS-чанков
     String url = doc["url"] | "";
-    String name = doc["name"] | "";
-    if (url.length() == 0 || name.length() == 0)
+    if (url.length() == 0 || !animFile)
         return;
 
-    HTTPClient http;
-    http.begin(url);
-    int httpCode = http.GET();
+    gifPull.url = url;
+    gifPull.expectedMd5 = doc["md5"] | "";
+    gifPull.lastAck = 0;
+    gifPull.md5.begin();
+
+    appState.isDataLoading = true;
+    updateConnectionStatus();
+    // "pull" сообщает backend, что бинарные чанки по WS слать не нужно
+    sendWebSocketMessage("{\"type\":\"gif_ack\",\"offset\":0,\"pull\":true}");
 
-    if (httpCode == HTTP_CODE_OK)
+    gifPull.http.setTimeout(GIF_PULL_TIMEOUT_MS);
+    gifPull.http.begin(url);
+    int httpCode = gifPull.http.GET();
+
+    if (httpCode != HTTP_CODE_OK)
     {
-        if (LittleFS.exists("/" + name))
-        {
-            LittleFS.remove("/" + name);
-        }
+        finishGifPull("HTTP " + String(httpCode));
+        return;
+    }
+    if (gifPull.http.getSize() != (int)appState.animTotalSize)
+    {
+        finishGifPull("size mismatch");
+        return;
+    }
 
-        File file = LittleFS.open("/" + name, "w");
-        if (file)
-        {
-            WiFiClient *stream = http.getStreamPtr();
-            uint8_t buff[256] = {0};
-            int len = stream->available();
+    // Мы внутри WS-колбэка: тело качает updateGifPull() из основного цикла,
+    // иначе webSocket.loop() не отвечает на ping и backend рвёт соединение
+    gifPull.active = true;
+    gifPull.lastDataAt = millis();
+}
+
+void updateGifPull()
+{
+    if (!gifPull.active)
+        return;
 
-            while (len > 0)
+    WiFiClient *stream = gifPull.http.getStreamPtr();
+    if (stream == nullptr)
+    {
+        finishGifPull("connection lost");
+        return;
+    }
+
+    uint8_t buff[1024];
+    size_t sliceBytes = 0;
+
+    // Читаем до total_size: available() == 0 ещё не значит конец тела
+    while (appState.animReceivedBytes < appState.animTotalSize && sliceBytes < GIF_PULL_SLICE_BYTES)
+    {
+        size_t len = stream->available();
+        if (len == 0)
+        {
+            if (!stream->connected() || millis() - gifPull.lastDataAt > GIF_PULL_TIMEOUT_MS)
             {
-                if (len > 0)
-                {
-                    size_t bytesToRead = (len > 256) ? 256 : len;
-                    int bytesRead = stream->readBytes(buff, bytesToRead);
-                    file.write(buff, bytesRead);
-                    len = stream->available();
-                }
-                else
-                {
-                    len = stream->available();
-                }
+                finishGifPull("download stalled");
             }
-            file.close();
-            Serial.println("GIF downloaded: " + name);
+            return;
         }
+
+        size_t remaining = appState.animTotalSize - appState.animReceivedBytes;
+        size_t bytesToRead = len < sizeof(buff) ? len : sizeof(buff);
+        if (bytesToRead > remaining)
+            bytesToRead = remaining;
+
+        int bytesRead = stream->readBytes(buff, bytesToRead);
+        if (bytesRead <= 0)
+            return;
+
+        animFile.write(buff, bytesRead);
+        gifPull.md5.add(buff, bytesRead);
+        appState.animReceivedBytes += bytesRead;
+        sliceBytes += bytesRead;
+        gifPull.lastDataAt = millis();
+
+        if (appState.animReceivedBytes - gifPull.lastAck >= GIF_PULL_ACK_BYTES)
+        {
+            sendGifAck(appState.animReceivedBytes);
+            gifPull.lastAck = appState.animReceivedBytes;
+        }
+    }
+
+    if (appState.animReceivedBytes >= appState.animTotalSize)
+    {
+        finishGifPull("");
     }
-    http.end();
+}
+
+void abortGifPull()
+{
+    if (!gifPull.active)
+        return;
+
+    gifPull.active = false;
+    gifPull.http.end();
+    if (animFile)
+        animFile.close();
+    LittleFS.remove("/anim.bin");
+
+    appState.isDataLoading = false;
+    updateConnectionStatus();
+    Serial.println("[Anim] Download aborted");
 }
 
 
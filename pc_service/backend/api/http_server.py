@@ -1,5 +1,4 @@
 import asyncio
-import json
 import re
 from copy import deepcopy
 from datetime import datetime
@@ -10,64 +9,43 @@ import aiohttp
 from aiohttp import web
 
 from backend.core.alive_services import AppContext
-from backend.core.paths import data_path
-
-
-DEFAULT_APP_SETTINGS = {
-    "wifi": {"ssid": "", "password": ""},
-    "weather": {
-        "api_key": "",
-        "latitude": "55.7558",
-        "longitude": "37.6173",
-        "timeout_sec": 1800,
-    },
-    "display": {
-        "brightness": 180,
-        "weather_dependent": False,
-        "off_time": "23:00",
-        "on_time": "07:00",
-        "accent_color": "#FFAA00",
-    },
-    "backlight": {
-        "brightness": 180,
-        "mode": "5",
-        "led_mode": 5,
-        "weather_dependent": False,
-        "color": "#33CCFF",
-    },
-    "schedule": {
-        "start_time": "07:30",
-        "end_time": "19:30",
-        "sources": [
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-        ],
-    },
-    "ota": {
-        "url": "",
-        "firmware_path": "",
-    },
-    "network": {
-        "ws_port": 8765,
-        "udp_port": 45678,
-    },
-    "ui_colors": {},
-}
-HEX_COLOR_RE = re.compile(r"^#?[0-9A-Fa-f]{6}$")
+from backend.core.metrics import PrometheusText
+from backend.core.network import resolve_local_ip
+from backend.core.settings import (
+    clamp_brightness,
+    deep_merge,
+    get_settings_store,
+    normalize_hex_color,
+    normalize_port,
+    normalize_settings,
+    normalize_time,
+)
 
 
-class APIServer:
-    SETTINGS_PATH = data_path("backend", "storage", "settings.json")
-    LEGACY_UI_SETTINGS_PATH = data_path("backend", "storage", "ui_settings.json")
-    BUS_SETTINGS_PATH = SETTINGS_PATH
+ASSET_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+FIRMWARE_KEY_RE = re.compile(r"^[0-9a-f]{40}$")
+# Asset URLs are content-addressed, so a response never changes for its URL.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 8787):
+class APIServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8787,
+        *,
+        assets_host: str = "0.0.0.0",
+        assets_port: int = 8788,
+    ):
         self.host = host
         self.port = port
+        self.assets_host = assets_host
+        self.assets_port = assets_port
         self.app = web.Application()
+        # The device downloads files from here, so unlike the API it listens on the LAN.
+        self.assets_app = web.Application()
         self.runner: web.AppRunner | None = None
+        self.assets_runner: web.AppRunner | None = None
         self._gif_state = {
             "stage": "idle",
             "progress": 0,
@@ -81,6 +59,7 @@ class APIServer:
         self._weather_task: asyncio.Task | None = None
         self._last_weather_display: int | None = None
         self._last_weather_backlight: int | None = None
+        self.settings = get_settings_store()
         self._setup_routes()
 
     async def start(self):
@@ -88,12 +67,18 @@ class APIServer:
         await self.runner.setup()
         site = web.TCPSite(self.runner, self.host, self.port)
         await site.start()
-        if self._weather_task is None or self._weather_task.done():
-            self._weather_task = asyncio.create_task(self._weather_push_loop())
+        self.assets_runner = web.AppRunner(self.assets_app)
+        await self.assets_runner.setup()
+        assets_site = web.TCPSite(self.assets_runner, self.assets_host, self.assets_port)
+        await assets_site.start()
+        await self.resume_weather()
         print(f"HTTP API started on http://{self.host}:{self.port}")
+        print(f"Asset server started on http://{self.assets_host}:{self.assets_port}")
 
     def _setup_routes(self):
         self.app.router.add_get("/api/status", self.get_status)
+        self.app.router.add_get("/api/metrics", self.get_metrics)
+        self.app.router.add_get("/api/telemetry/history", self.get_telemetry_history)
         self.app.router.add_post("/api/esp/command", self.post_command)
         self.app.router.add_post("/api/esp/color", self.post_color)
         self.app.router.add_post("/api/esp/display", self.post_display)
@@ -102,6 +87,11 @@ class APIServer:
         self.app.router.add_post("/api/esp/ota", self.post_ota)
         self.app.router.add_get("/api/settings", self.get_settings)
         self.app.router.add_put("/api/settings", self.put_settings)
+        self.assets_app.router.add_get("/assets/gif/{key}.bin", self.get_gif_asset)
+        self.assets_app.router.add_get("/assets/firmware/{key}.bin", self.get_firmware_asset)
+
+    def asset_base_url(self) -> str:
+        return f"http://{resolve_local_ip()}:{self.assets_port}"
 
     async def get_status(self, _request: web.Request):
         esp_service = AppContext.esp_service
@@ -113,9 +103,142 @@ class APIServer:
                 "last_message": last_message,
                 "gif_transfer": self._gif_state,
                 "ota_transfer": self._ota_state,
+                "gif_cache": esp_service.gif_cache.stats() if esp_service else None,
+                "esp_outbound": esp_service.conn.stats() if esp_service else None,
+                "event_bus": AppContext.event_bus.stats() if AppContext.event_bus else None,
+                "pc_load": esp_service.pc_load_policy.stats() if esp_service else None,
+                "interest": esp_service.interest.stats() if esp_service else None,
+                "settings": self.settings.stats(),
+                "producers": AppContext.producers.status() if AppContext.producers else None,
             }
         )
 
+    async def get_metrics(self, _request: web.Request):
+        metrics = PrometheusText()
+
+        bus = AppContext.event_bus
+        if bus is not None:
+            subscriptions = bus.subscriptions()
+            labels = [{"topic": sub.event_type, "subscriber": sub.name} for sub in subscriptions]
+            metrics.counter(
+                "deskhub_event_bus_published_total",
+                "Events published per topic.",
+                [({"topic": topic}, count) for topic, count in bus.published.items()],
+            )
+            metrics.counter(
+                "deskhub_event_bus_delivered_total",
+                "Events handed to each subscriber callback.",
+                zip(labels, (sub.delivered for sub in subscriptions)),
+            )
+            metrics.counter(
+                "deskhub_event_bus_dropped_total",
+                "Events dropped by a full subscriber queue.",
+                zip(labels, (sub.dropped for sub in subscriptions)),
+            )
+            metrics.counter(
+                "deskhub_event_bus_errors_total",
+                "Exceptions raised by subscriber callbacks.",
+                zip(labels, (sub.errors for sub in subscriptions)),
+            )
+            metrics.gauge(
+                "deskhub_event_bus_queue_depth",
+                "Events waiting in each subscriber queue.",
+                zip(labels, (sub.depth for sub in subscriptions)),
+            )
+            metrics.gauge(
+                "deskhub_event_bus_lag_seconds",
+                "Age of the oldest undelivered event per subscriber.",
+                zip(labels, (sub.lag() for sub in subscriptions)),
+            )
+            metrics.histogram(
+                "deskhub_event_bus_callback_seconds",
+                "Subscriber callback duration.",
+                zip(labels, (sub.latency for sub in subscriptions)),
+            )
+            metrics.gauge(
+                "deskhub_event_bus_retained_topics",
+                "Topics holding a retained event.",
+                [({}, bus.retained_size)],
+            )
+
+        esp_service = AppContext.esp_service
+        if esp_service is not None:
+            conn = esp_service.conn
+            totals = conn.totals()
+            metrics.gauge("deskhub_esp_clients", "Connected ESP clients.", [({}, len(conn.clients))])
+            metrics.counter("deskhub_esp_connections_total", "ESP WebSocket connections accepted.", [({}, conn.connections)])
+            metrics.counter("deskhub_esp_messages_received_total", "Messages received from ESP clients.", [({}, conn.received)])
+            metrics.counter("deskhub_esp_messages_sent_total", "Messages sent to ESP clients.", [({}, totals["sent"])])
+            metrics.counter("deskhub_esp_frames_sent_total", "WebSocket frames sent to ESP clients.", [({}, totals["frames"])])
+            metrics.counter("deskhub_esp_messages_batched_total", "Messages sent inside batch frames.", [({}, totals["batched"])])
+            metrics.counter("deskhub_esp_sent_bytes_total", "Payload bytes sent to ESP clients.", [({}, totals["sent_bytes"])])
+            metrics.counter("deskhub_esp_messages_dropped_total", "Lossy messages dropped by full queues.", [({}, totals["dropped"])])
+            metrics.counter("deskhub_esp_messages_coalesced_total", "Messages superseded while queued.", [({}, totals["coalesced"])])
+            policy = esp_service.pc_load_policy
+            metrics.counter(
+                "deskhub_esp_pc_load_frames_total",
+                "pc_load samples by outcome.",
+                [
+                    ({"result": "changed"}, policy.sent - policy.heartbeats),
+                    ({"result": "heartbeat"}, policy.heartbeats),
+                    ({"result": "suppressed"}, policy.suppressed),
+                ],
+            )
+
+        return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": PrometheusText.CONTENT_TYPE})
+
+    async def get_telemetry_history(self, request: web.Request):
+        history = AppContext.telemetry_history
+        if history is None:
+            raise web.HTTPServiceUnavailable(text="Telemetry history is not running")
+
+        resolution = request.query.get("resolution", "raw")
+        try:
+            since = float(request.query["since"]) if "since" in request.query else None
+            until = float(request.query["until"]) if "until" in request.query else None
+            data = history.query(resolution, since, until)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        return web.json_response(data)
+
+    async def get_gif_asset(self, request: web.Request):
+        key = request.match_info["key"]
+        esp_service = AppContext.esp_service
+        if esp_service is None or not ASSET_KEY_RE.fullmatch(key):
+            raise web.HTTPNotFound()
+
+        path = await asyncio.to_thread(esp_service.gif_cache.entry_path, key)
+        if path is None:
+            raise web.HTTPNotFound()
+
+        # FileResponse handles Content-Length, ETag, conditional and Range requests.
+        return web.FileResponse(
+            path,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            },
+        )
+
+    async def get_firmware_asset(self, request: web.Request):
+        key = request.match_info["key"]
+        esp_service = AppContext.esp_service
+        if esp_service is None or not FIRMWARE_KEY_RE.fullmatch(key):
+            raise web.HTTPNotFound()
+
+        image = await asyncio.to_thread(esp_service.firmware_store.lookup, key)
+        if image is None:
+            raise web.HTTPNotFound()
+
+        # Sent with sendfile; Range lets the device resume a broken download.
+        return web.FileResponse(
+            image.path,
+            headers={
+                "Content-Type": "application/octet-stream",
+                "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+            },
+        )
+
     async def post_command(self, request: web.Request):
         payload = await request.json()
         await self._send_to_esp(payload)
@@ -125,7 +248,7 @@ class APIServer:
         payload = await request.json()
         screen = str(payload.get("screen", "screen1")).strip() or "screen1"
         element = str(payload.get("element", "")).strip()
-        color = self._normalize_hex_color(payload.get("color"))
+        color = normalize_hex_color(payload.get("color"))
         if not element:
             raise web.HTTPBadRequest(text="element is required")
         if not color:
@@ -190,18 +313,15 @@ class APIServer:
         return web.json_response({"ok": True})
 
     async def get_settings(self, _request: web.Request):
-        data = self._load_settings()
+        data = self.settings.snapshot()
         return web.json_response(data)
 
     async def put_settings(self, request: web.Request):
         payload = await request.json()
-        current = self._load_settings()
-        merged = self._deep_merge(deepcopy(current), payload)
-        normalized = self._normalize_settings(merged, prefer_bus_settings=False)
-
-        self._save_settings(normalized)
-        self._sync_bus_settings(normalized.get("schedule", {}))
-        self._refresh_bus_service_cache()
+        current = self.settings.snapshot()
+        merged = deep_merge(deepcopy(current), payload)
+        normalized = normalize_settings(merged)
+        self.settings.save(normalized)
 
         esp_patch = self._build_esp_settings_patch(current, normalized)
         sent_to_esp = False
@@ -241,6 +361,9 @@ class APIServer:
                 delay_ms=int(payload.get("delay", payload.get("delay_ms", 200))),
                 chunk_size=int(payload.get("chunk_size", 1024)),
                 chunk_delay_sec=float(payload.get("chunk_delay_sec", 0.05)),
+                flow=str(payload.get("flow", "auto")),
+                transport=str(payload.get("transport", "push")),
+                asset_base_url=self.asset_base_url(),
                 progress_cb=self._set_gif_state,
             )
         except Exception as e:
@@ -254,21 +377,19 @@ class APIServer:
                 raise FileNotFoundError(f"Firmware file not found: {firmware_path}")
 
             await self._set_ota_state("working", 10, "Preparing firmware")
-            await asyncio.sleep(0.2)
-
             await self._set_ota_state("working", 35, "Sending OTA command")
-            await esp_service.send_ota_command(str(path))
-            await asyncio.sleep(0.2)
+            image = await esp_service.send_ota_command(str(path), asset_base_url=self.asset_base_url())
 
-            await self._set_ota_state("done", 100, f"OTA command sent: {path.name}")
+            await self._set_ota_state("done", 100, f"OTA command sent: {image.name} (md5 {image.md5})")
         except Exception as e:
             self._ota_state = {"stage": "error", "progress": 0, "message": f"OTA error: {e}"}
 
-    async def _set_gif_state(self, stage: str, progress: int, message: str):
+    async def _set_gif_state(self, stage: str, progress: int, message: str, **details: Any):
         self._gif_state = {
             "stage": stage,
             "progress": max(0, min(int(progress), 100)),
             "message": message,
+            **details,
         }
 
     async def _set_ota_state(self, stage: str, progress: int, message: str):
@@ -290,7 +411,7 @@ class APIServer:
         payload["weather_brightness"] = weather_brightness
 
     async def _resolve_weather_brightness(self, settings: dict[str, Any] | None = None) -> int | None:
-        settings = settings or self._load_settings()
+        settings = settings or self.settings.snapshot()
         weather = settings.get("weather", {})
 
         try:
@@ -338,11 +459,27 @@ class APIServer:
         brightness = int(round(base - cloud_penalty))
         return max(0, min(brightness, 255))
 
+    async def resume_weather(self):
+        if self._weather_task is None or self._weather_task.done():
+            self._weather_task = asyncio.create_task(self._weather_push_loop())
+
+    async def suspend_weather(self):
+        task, self._weather_task = self._weather_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        # Re-send weather brightness after resuming.
+        self._last_weather_display = None
+        self._last_weather_backlight = None
+
     async def _weather_push_loop(self):
         while True:
             await asyncio.sleep(2.0)
             try:
-                settings = self._load_settings()
+                settings = self.settings.snapshot()
                 display = settings.get("display", {})
                 backlight = settings.get("backlight", {})
 
@@ -405,204 +542,15 @@ class APIServer:
         esp_service = self._require_esp_service()
         await esp_service.conn.broadcast(payload)
 
-    def _load_settings(self) -> dict[str, Any]:
-        data: dict[str, Any] = {}
-
-        if self.SETTINGS_PATH.exists():
-            with open(self.SETTINGS_PATH, "r", encoding="utf-8") as f:
-                try:
-                    data = json.load(f)
-                except Exception:
-                    data = {}
-
-        # Backward compatibility: merge old ui_settings.json if it still exists.
-        if self.LEGACY_UI_SETTINGS_PATH.exists():
-            with open(self.LEGACY_UI_SETTINGS_PATH, "r", encoding="utf-8") as f:
-                try:
-                    legacy = json.load(f)
-                except Exception:
-                    legacy = {}
-            # New settings.json has priority on key conflicts.
-            data = self._deep_merge(legacy, data)
-
-        merged = self._deep_merge(deepcopy(DEFAULT_APP_SETTINGS), data)
-        return self._normalize_settings(merged)
-
-    def _save_settings(self, data: dict[str, Any]):
-        self.SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
     def _store_interface_color(self, *, screen: str, element: str, color: str):
-        settings = self._load_settings()
-        ui_colors = settings.get("ui_colors")
-        if not isinstance(ui_colors, dict):
-            ui_colors = {}
-            settings["ui_colors"] = ui_colors
-
-        screen_colors = ui_colors.get(screen)
-        if not isinstance(screen_colors, dict):
-            screen_colors = {}
-            ui_colors[screen] = screen_colors
-
-        if screen_colors.get(element) == color:
+        current = self.settings.snapshot()
+        if current["ui_colors"].get(screen, {}).get(element) == color:
             return
 
-        screen_colors[element] = color
-        normalized = self._normalize_settings(settings, prefer_bus_settings=False)
-        self._save_settings(normalized)
-
-    def _normalize_settings(self, data: dict[str, Any], prefer_bus_settings: bool = True) -> dict[str, Any]:
-        normalized = self._deep_merge(deepcopy(DEFAULT_APP_SETTINGS), data)
-
-        display = normalized.get("display", {})
-        backlight = normalized.get("backlight", {})
-
-        # Migrate legacy fields from display block.
-        if "backlight" in display and "brightness" not in backlight:
-            backlight["brightness"] = display.get("backlight", 180)
-        if "mode" in display and "mode" not in backlight:
-            backlight["mode"] = str(display.get("mode", "5"))
-        if "led_mode" in display and "led_mode" not in backlight:
-            backlight["led_mode"] = int(display.get("led_mode", 5))
-        if "auto_brightness" in display and "weather_dependent" not in display:
-            display["weather_dependent"] = bool(display.get("auto_brightness", False))
-
-        backlight["mode"] = str(backlight.get("mode", "5"))
-        try:
-            backlight["led_mode"] = int(backlight.get("led_mode", backlight.get("mode", 5)))
-        except (TypeError, ValueError):
-            backlight["led_mode"] = 5
-
-        display["brightness"] = self._clamp_brightness(display.get("brightness", 180))
-        backlight["brightness"] = self._clamp_brightness(backlight.get("brightness", 180))
-
-        display["weather_dependent"] = bool(display.get("weather_dependent", False))
-        backlight["weather_dependent"] = bool(backlight.get("weather_dependent", False))
-
-        schedule = normalized.get("schedule", {})
-        schedule_sources = self._normalize_schedule_sources(schedule.get("sources", []))
-        schedule["sources"] = schedule_sources
-        schedule["start_time"] = self._normalize_time(schedule.get("start_time", "07:30"), "07:30")
-        schedule["end_time"] = self._normalize_time(schedule.get("end_time", "19:30"), "19:30")
-
-        # Legacy compatibility: when loading settings for UI/runtime, allow bus_settings
-        # to backfill schedule block. During PUT /settings we keep schedule values from payload.
-        if prefer_bus_settings:
-            bus_settings = normalized.get("bus_settings", {})
-            if isinstance(bus_settings, dict):
-                interval = bus_settings.get("time_interval", {})
-                if isinstance(interval, dict):
-                    schedule["start_time"] = self._normalize_time(interval.get("start", schedule["start_time"]), schedule["start_time"])
-                    schedule["end_time"] = self._normalize_time(interval.get("end", schedule["end_time"]), schedule["end_time"])
-
-                bus_stops = bus_settings.get("stops", [])
-                if isinstance(bus_stops, list) and bus_stops:
-                    mapped_sources = []
-                    for stop in bus_stops:
-                        if not isinstance(stop, dict):
-                            continue
-                        mapped_sources.append(
-                            {
-                                "url": str(stop.get("url", "")).strip(),
-                                "stop_name": str(stop.get("stop_name", "")).strip(),
-                                "bus_number": str(stop.get("name", "")).strip(),
-                            }
-                        )
-                    schedule["sources"] = self._normalize_schedule_sources(mapped_sources)
-
-        normalized["display"] = display
-        normalized["backlight"] = backlight
-        normalized["schedule"] = schedule
-        normalized["ota"] = {
-            "url": str(normalized.get("ota", {}).get("url", "")).strip(),
-            "firmware_path": str(normalized.get("ota", {}).get("firmware_path", "")).strip(),
-        }
-        normalized["network"] = {
-            "ws_port": self._normalize_port(normalized.get("network", {}).get("ws_port", 8765), 8765),
-            "udp_port": self._normalize_port(normalized.get("network", {}).get("udp_port", 45678), 45678),
-        }
-        normalized["ui_colors"] = self._normalize_ui_colors(normalized.get("ui_colors", {}))
-
-        return normalized
-
-    def _normalize_ui_colors(self, raw_ui_colors: Any) -> dict[str, dict[str, str]]:
-        normalized: dict[str, dict[str, str]] = {}
-        if not isinstance(raw_ui_colors, dict):
-            return normalized
-
-        for screen, elements in raw_ui_colors.items():
-            screen_key = str(screen or "").strip()
-            if not screen_key or not isinstance(elements, dict):
-                continue
-
-            normalized_elements: dict[str, str] = {}
-            for element, color in elements.items():
-                element_key = str(element or "").strip()
-                color_hex = self._normalize_hex_color(color)
-                if not element_key or not color_hex:
-                    continue
-                normalized_elements[element_key] = color_hex
-
-            if normalized_elements:
-                normalized[screen_key] = normalized_elements
-
-        return normalized
-
-    def _normalize_hex_color(self, value: Any) -> str:
-        raw = str(value or "").strip()
-        if not raw:
-            return ""
-        if not HEX_COLOR_RE.fullmatch(raw):
-            return ""
-        prefixed = raw if raw.startswith("#") else f"#{raw}"
-        return prefixed.upper()
-
-    def _normalize_schedule_sources(self, raw_sources: Any) -> list[dict[str, str]]:
-        normalized: list[dict[str, str]] = []
-        for entry in raw_sources or []:
-            if isinstance(entry, str):
-                normalized.append({"url": entry.strip(), "stop_name": "", "bus_number": ""})
-            elif isinstance(entry, dict):
-                normalized.append(
-                    {
-                        "url": str(entry.get("url", "")).strip(),
-                        "stop_name": str(entry.get("stop_name", entry.get("name", ""))).strip(),
-                        "bus_number": str(entry.get("bus_number", entry.get("name", ""))).strip(),
-                    }
-                )
-
-        while len(normalized) < 4:
-            normalized.append({"url": "", "stop_name": "", "bus_number": ""})
-        return normalized[:4]
-
-    def _normalize_time(self, value: Any, fallback: str) -> str:
-        raw = str(value or "").strip()
-        try:
-            parts = raw.split(":")
-            if len(parts) != 2:
-                return fallback
-            hours = int(parts[0])
-            minutes = int(parts[1])
-            if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-                return fallback
-            return f"{hours:02d}:{minutes:02d}"
-        except Exception:
-            return fallback
-
-    def _clamp_brightness(self, value: Any) -> int:
-        try:
-            number = int(value)
-        except (TypeError, ValueError):
-            number = 180
-        return max(0, min(number, 255))
-
-    def _normalize_port(self, value: Any, fallback: int) -> int:
-        try:
-            port = int(value)
-        except (TypeError, ValueError):
-            port = fallback
-        return max(1, min(65535, port))
+        # The snapshot is normalized and `color` already validated, so only this entry changes.
+        settings = deepcopy(current)
+        settings["ui_colors"].setdefault(screen, {})[element] = color
+        self.settings.save(settings)
 
     def _normalize_timeout_sec(self, value: Any, fallback: int = 1800) -> int:
         try:
@@ -611,50 +559,6 @@ class APIServer:
             timeout = fallback
         return max(1, timeout)
 
-    def _sync_bus_settings(self, schedule: dict[str, Any]):
-        if self.BUS_SETTINGS_PATH.exists():
-            with open(self.BUS_SETTINGS_PATH, "r", encoding="utf-8") as f:
-                bus_settings = json.load(f)
-        else:
-            bus_settings = {"bus_settings": {"stops": [], "time_interval": {"start": "07:30", "end": "19:30"}}}
-
-        if "bus_settings" not in bus_settings:
-            bus_settings["bus_settings"] = {}
-
-        stops = []
-        for source in self._normalize_schedule_sources(schedule.get("sources", [])):
-            if not source["url"]:
-                continue
-            stops.append(
-                {
-                    "url": source["url"],
-                    "stop_name": source["stop_name"],
-                    "name": source["bus_number"] or source["stop_name"] or "Bus",
-                }
-            )
-
-        bus_settings["bus_settings"]["stops"] = stops
-        bus_settings["bus_settings"]["time_interval"] = {
-            "start": self._normalize_time(schedule.get("start_time"), "07:30"),
-            "end": self._normalize_time(schedule.get("end_time"), "19:30"),
-        }
-
-        self.BUS_SETTINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.BUS_SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(bus_settings, f, ensure_ascii=False, indent=2)
-
-    def _refresh_bus_service_cache(self):
-        bus_service = AppContext.bus_service
-        if bus_service is None:
-            return
-
-        try:
-            bus_service.settings = bus_service._load_settings()
-            bus_service.time_interval = bus_service.settings["bus_settings"]["time_interval"]
-            asyncio.create_task(bus_service.update_cache())
-        except Exception as e:
-            print("Failed to refresh bus service cache:", e)
-
     def _build_esp_settings_patch(self, previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
         # Base rule: send every changed setting except schedule.sources.
         patch: dict[str, Any] = self._build_generic_settings_diff(previous, current)
@@ -688,8 +592,8 @@ class APIServer:
         previous_display = previous.get("display", {}) if isinstance(previous.get("display"), dict) else {}
         current_display = current.get("display", {}) if isinstance(current.get("display"), dict) else {}
 
-        prev_screen_brightness = self._clamp_brightness(previous_display.get("brightness", 180))
-        curr_screen_brightness = self._clamp_brightness(current_display.get("brightness", 180))
+        prev_screen_brightness = clamp_brightness(previous_display.get("brightness", 180))
+        curr_screen_brightness = clamp_brightness(current_display.get("brightness", 180))
         if prev_screen_brightness != curr_screen_brightness:
             patch["screen_brightness"] = curr_screen_brightness
 
@@ -706,8 +610,8 @@ class APIServer:
         previous_backlight = previous.get("backlight", {}) if isinstance(previous.get("backlight"), dict) else {}
         current_backlight = current.get("backlight", {}) if isinstance(current.get("backlight"), dict) else {}
 
-        prev_backlight_brightness = self._clamp_brightness(previous_backlight.get("brightness", 180))
-        curr_backlight_brightness = self._clamp_brightness(current_backlight.get("brightness", 180))
+        prev_backlight_brightness = clamp_brightness(previous_backlight.get("brightness", 180))
+        curr_backlight_brightness = clamp_brightness(current_backlight.get("brightness", 180))
         if prev_backlight_brightness != curr_backlight_brightness:
             patch["led_brightness"] = curr_backlight_brightness
 
@@ -726,27 +630,27 @@ class APIServer:
         if prev_backlight_weather != curr_backlight_weather:
             patch["led_weather_dependent"] = curr_backlight_weather
 
-        prev_on = self._normalize_time(previous_display.get("on_time", "07:00"), "07:00")
-        curr_on = self._normalize_time(current_display.get("on_time", "07:00"), "07:00")
+        prev_on = normalize_time(previous_display.get("on_time", "07:00"), "07:00")
+        curr_on = normalize_time(current_display.get("on_time", "07:00"), "07:00")
         if prev_on != curr_on:
             patch["screen_on_time"] = curr_on
 
-        prev_off = self._normalize_time(previous_display.get("off_time", "23:00"), "23:00")
-        curr_off = self._normalize_time(current_display.get("off_time", "23:00"), "23:00")
+        prev_off = normalize_time(previous_display.get("off_time", "23:00"), "23:00")
+        curr_off = normalize_time(current_display.get("off_time", "23:00"), "23:00")
         if prev_off != curr_off:
             patch["screen_off_time"] = curr_off
 
         previous_schedule = previous.get("schedule", {}) if isinstance(previous.get("schedule"), dict) else {}
         current_schedule = current.get("schedule", {}) if isinstance(current.get("schedule"), dict) else {}
 
-        prev_start = self._normalize_time(previous_schedule.get("start_time", "07:30"), "07:30")
-        curr_start = self._normalize_time(current_schedule.get("start_time", "07:30"), "07:30")
+        prev_start = normalize_time(previous_schedule.get("start_time", "07:30"), "07:30")
+        curr_start = normalize_time(current_schedule.get("start_time", "07:30"), "07:30")
         if prev_start != curr_start:
             patch["schedule_start_time"] = curr_start
             patch["backlight_on_time"] = curr_start
 
-        prev_end = self._normalize_time(previous_schedule.get("end_time", "19:30"), "19:30")
-        curr_end = self._normalize_time(current_schedule.get("end_time", "19:30"), "19:30")
+        prev_end = normalize_time(previous_schedule.get("end_time", "19:30"), "19:30")
+        curr_end = normalize_time(current_schedule.get("end_time", "19:30"), "19:30")
         if prev_end != curr_end:
             patch["schedule_end_time"] = curr_end
             patch["backlight_off_time"] = curr_end
@@ -760,8 +664,8 @@ class APIServer:
 
         previous_network = previous.get("network", {}) if isinstance(previous.get("network"), dict) else {}
         current_network = current.get("network", {}) if isinstance(current.get("network"), dict) else {}
-        prev_ws_port = self._normalize_port(previous_network.get("ws_port", 8765), 8765)
-        curr_ws_port = self._normalize_port(current_network.get("ws_port", 8765), 8765)
+        prev_ws_port = normalize_port(previous_network.get("ws_port", 8765), 8765)
+        curr_ws_port = normalize_port(current_network.get("ws_port", 8765), 8765)
         if prev_ws_port != curr_ws_port:
             patch["ws_port"] = curr_ws_port
 
@@ -783,9 +687,9 @@ class APIServer:
         backlight = settings.get("backlight", {}) if isinstance(settings.get("backlight"), dict) else {}
         weather = settings.get("weather", {}) if isinstance(settings.get("weather"), dict) else {}
 
-        snapshot["screen_brightness"] = self._clamp_brightness(display.get("brightness", 180))
+        snapshot["screen_brightness"] = clamp_brightness(display.get("brightness", 180))
         snapshot["auto_brightness"] = bool(display.get("weather_dependent", display.get("auto_brightness", False)))
-        snapshot["led_brightness"] = self._clamp_brightness(backlight.get("brightness", 180))
+        snapshot["led_brightness"] = clamp_brightness(backlight.get("brightness", 180))
         snapshot["led_mode"] = self._normalize_led_mode(backlight.get("led_mode", backlight.get("mode", 5)))
 
         led_color = str(backlight.get("color", "")).strip()
@@ -804,8 +708,8 @@ class APIServer:
         snapshot["weather_api_key"] = api_key
         snapshot["weather_timeout_sec"] = self._normalize_timeout_sec(weather.get("timeout_sec", 1800))
 
-        on_time = self._normalize_time(display.get("on_time", "07:00"), "07:00")
-        off_time = self._normalize_time(display.get("off_time", "23:00"), "23:00")
+        on_time = normalize_time(display.get("on_time", "07:00"), "07:00")
+        off_time = normalize_time(display.get("off_time", "23:00"), "23:00")
         sleep_start_hour, sleep_start_minute = self._time_to_parts(off_time)
         sleep_end_hour, sleep_end_minute = self._time_to_parts(on_time)
         snapshot["sleep_enabled"] = True
@@ -859,14 +763,6 @@ class APIServer:
             return raw
 
     def _time_to_parts(self, value: Any) -> tuple[int, int]:
-        normalized = self._normalize_time(value, "00:00")
+        normalized = normalize_time(value, "00:00")
         hours, minutes = normalized.split(":")
         return int(hours), int(minutes)
-
-    def _deep_merge(self, base: dict[str, Any], patch: dict[str, Any]) -> dict[str, Any]:
-        for k, v in patch.items():
-            if k in base and isinstance(base[k], dict) and isinstance(v, dict):
-                base[k] = self._deep_merge(base[k], v)
-            else:
-                base[k] = v
-        return base
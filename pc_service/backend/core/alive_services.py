@@ -1,3 +1,6 @@
 class AppContext:
+    event_bus = None
     bus_service = None
     esp_service = None
+    telemetry_history = None
+    producers = None
@@ -1,22 +1,225 @@
 import asyncio
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
+from enum import Enum
+
+from .metrics import Histogram
+
+
+class Overflow(str, Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class _Subscription:
+    """
+    One subscriber with its own bounded queue and worker task.
+
+    The worker delivers events in publish order. When the queue is full the
+    overflow policy decides whether the oldest queued event is dropped, the
+    new one is dropped, or the publisher waits for room.
+    """
+
+    def __init__(self, event_type: str, callback, max_queue: int, overflow: Overflow):
+        self.event_type = event_type
+        self.callback = callback
+        self.max_queue = max(1, int(max_queue))
+        self.overflow = Overflow(overflow)
+        # (event, loop time at publish)
+        self._queue: deque[tuple[dict, float]] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_lag = 0.0
+        self.latency = Histogram()
+
+    @property
+    def name(self) -> str:
+        return getattr(self.callback, "__qualname__", repr(self.callback))
+
+    def _start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def offer(self, event: dict):
+        """Queue `event` without waiting; used to replay a retained event."""
+        self._start()
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((event, asyncio.get_running_loop().time()))
+        self._ready.set()
+
+    async def put(self, event: dict):
+        self._start()
+
+        while len(self._queue) >= self.max_queue:
+            if self.overflow == Overflow.DROP_OLDEST:
+                self._queue.popleft()
+                self.dropped += 1
+                break
+            if self.overflow == Overflow.DROP_NEWEST:
+                self.dropped += 1
+                return
+            self._space.clear()
+            await self._space.wait()
+
+        self._queue.append((event, asyncio.get_running_loop().time()))
+        self._ready.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            event, published_at = self._queue.popleft()
+            self._space.set()
+            await self.deliver(event)
+            self.max_lag = max(self.max_lag, loop.time() - published_at)
+
+    async def deliver(self, event: dict):
+        started = time.perf_counter()
+        try:
+            await self.callback(event)
+        except Exception as e:
+            self.errors += 1
+            print(f"EventBus error in {self.name}: {e}")
+        self.latency.observe(time.perf_counter() - started)
+        self.delivered += 1
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def lag(self) -> float:
+        """Seconds the oldest undelivered event has been waiting."""
+        if not self._queue:
+            return 0.0
+        return asyncio.get_running_loop().time() - self._queue[0][1]
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "subscriber": self.name,
+            "overflow": self.overflow.value,
+            "depth": self.depth,
+            "max_queue": self.max_queue,
+            "lag_ms": round(self.lag() * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
 
 class EventBus:
-    def __init__(self):
+    """
+    In-process publish/subscribe.
+
+    By default every subscriber gets its own bounded queue and worker, so
+    `publish` only enqueues and a slow subscriber (e.g. an ESP send stuck
+    behind a GIF transfer) holds up neither the publisher nor the other
+    subscribers. `queued=False` restores the old behaviour: `publish` awaits
+    each callback in turn.
+
+    Topics marked with `retain()` keep their latest event, so state that is
+    only published on change (volume, current track) is available to late
+    subscribers via `last()` or replay on `subscribe()`.
+    """
+
+    def __init__(self, *, queued: bool = True, max_queue: int = 32, overflow: Overflow = Overflow.DROP_OLDEST):
+        self.queued = queued
+        self.max_queue = max_queue
+        self.overflow = Overflow(overflow)
         self._subscribers = defaultdict(list)
+        self._retained_topics: set[str] = set()
+        self._retained: dict[str, dict] = {}
+        self.published: dict[str, int] = defaultdict(int)
+
+    def retain(self, *event_types: str):
+        """Keep the latest event of each of these topics."""
+        self._retained_topics.update(event_types)
 
-    def subscribe(self, event_type: str, callback):
+    def last(self, event_type: str) -> dict | None:
+        """Latest retained event of `event_type`, or None."""
+        return self._retained.get(event_type)
+
+    @property
+    def retained_size(self) -> int:
+        """Number of retained topics currently holding an event."""
+        return len(self._retained)
+
+    def subscribe(
+        self,
+        event_type: str,
+        callback,
+        *,
+        max_queue: int | None = None,
+        overflow: Overflow | None = None,
+        replay: bool = True,
+    ):
         """
         callback: async function(event)
+
+        `max_queue` and `overflow` override the bus defaults for this subscriber.
+        With `replay`, a retained event of the topic is delivered right away.
         """
-        self._subscribers[event_type].append(callback)
+        subscription = _Subscription(
+            event_type,
+            callback,
+            self.max_queue if max_queue is None else max_queue,
+            self.overflow if overflow is None else overflow,
+        )
+        self._subscribers[event_type].append(subscription)
+
+        retained = self._retained.get(event_type)
+        if replay and retained is not None:
+            subscription.offer(retained)
 
     async def publish(self, event_type: str, event: dict):
+        self.published[event_type] += 1
+        if event_type in self._retained_topics:
+            self._retained[event_type] = event
+
         if event_type not in self._subscribers:
             return
 
-        for callback in self._subscribers[event_type]:
-            try:
-                await callback(event)
-            except Exception as e:
-                print(f"EventBus error: {e}")   
\ No newline at end of file
+        for subscription in self._subscribers[event_type]:
+            if self.queued:
+                await subscription.put(event)
+            else:
+                await subscription.deliver(event)
+
+    def subscriptions(self) -> list[_Subscription]:
+        return [subscription for subscriptions in self._subscribers.values() for subscription in subscriptions]
+
+    async def close(self):
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                await subscription.close()
+
+    def stats(self) -> dict:
+        return {
+            "retained": self.retained_size,
+            "subscribers": {
+                event_type: [subscription.stats() for subscription in subscriptions]
+                for event_type, subscriptions in self._subscribers.items()
+            },
+        }
@@ -1,41 +1,180 @@
 import subprocess
+import threading
+import time
+from typing import Optional
 
 
-def get_gpu_load_percent() -> float:
+def _hidden_window_kwargs() -> dict:
     create_no_window = getattr(subprocess, "CREATE_NO_WINDOW", 0)
     startupinfo = None
     if hasattr(subprocess, "STARTUPINFO"):
         startupinfo = subprocess.STARTUPINFO()
         startupinfo.dwFlags |= getattr(subprocess, "STARTF_USESHOWWINDOW", 0)
+    return {"creationflags": create_no_window, "startupinfo": startupinfo}
+
 
+def _parse_percent(line: str) -> Optional[float]:
+    line = line.strip()
+    if not line:
+        return None
     try:
-        result = subprocess.run(
-            [
-                "nvidia-smi",
-                "--query-gpu=utilization.gpu",
-                "--format=csv,noheader,nounits",
-            ],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            timeout=2,
-            creationflags=create_no_window,
-            startupinfo=startupinfo,
-        )
-    except Exception:
-        return 0.0
-
-    if result.returncode != 0:
-        return 0.0
-
-    for raw_line in result.stdout.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
+        return max(0.0, min(100.0, float(line)))
+    except ValueError:
+        return None
+
+
+class GpuSampler:
+    """
+    Long-lived GPU utilization sampler.
+
+    Runs a single `nvidia-smi --loop-ms` child and parses its output in a
+    daemon thread, instead of spawning a process per sample. The thread
+    stores `(value, monotonic time)` in one attribute, which readers take
+    without locking (attribute assignment is atomic), so `latest()` never
+    blocks the event loop.
+
+    Without a usable GPU (no `nvidia-smi`, or it exits before printing a
+    sample) the sampler stops trying and `latest()` returns 0.0. If it
+    dies after having worked, it is restarted after `restart_delay_sec`.
+    """
+
+    def __init__(
+        self,
+        *,
+        executable: str = "nvidia-smi",
+        interval_ms: int = 500,
+        gpu_index: int = 0,
+        restart_delay_sec: float = 5.0,
+    ):
+        self.executable = executable
+        self.interval_ms = max(100, int(interval_ms))
+        self.gpu_index = int(gpu_index)
+        self.restart_delay_sec = max(0.1, float(restart_delay_sec))
+        # A sample older than this reads as 0.0, e.g. while the child restarts.
+        self.stale_after_sec = max(2.0, 4 * self.interval_ms / 1000)
+
+        self._latest: tuple[float, float] | None = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process: Optional[subprocess.Popen] = None
+        self.available: Optional[bool] = None
+        self.samples = 0
+        self.restarts = 0
+
+    def command(self) -> list[str]:
+        return [
+            self.executable,
+            "--query-gpu=utilization.gpu",
+            "--format=csv,noheader,nounits",
+            f"--id={self.gpu_index}",
+            f"--loop-ms={self.interval_ms}",
+        ]
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="gpu-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest(self) -> float:
+        """Most recent utilization in percent, or 0.0 if none is fresh."""
+        sample = self._latest
+        if sample is None:
+            return 0.0
+        value, sampled_at = sample
+        if time.monotonic() - sampled_at > self.stale_after_sec:
+            return 0.0
+        return value
+
+    def _run(self):
+        while not self._stop.is_set():
+            produced = self._sample_until_exit()
+            if self._stop.is_set():
+                break
+            if not produced and not self.available:
+                if self.available is None:
+                    print("GPU sampler: nvidia-smi unavailable, GPU load reported as 0")
+                self.available = False
+                break
+            self.restarts += 1
+            self._stop.wait(self.restart_delay_sec)
+
+    def _sample_until_exit(self) -> bool:
+        """Run one child process until it exits; return whether it produced a sample."""
+        try:
+            process = subprocess.Popen(
+                self.command(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                **_hidden_window_kwargs(),
+            )
+        except OSError:
+            return False
+
+        self._process = process
+        produced = False
         try:
-            return max(0.0, min(100.0, float(line)))
-        except ValueError:
-            continue
+            for line in process.stdout:
+                value = _parse_percent(line)
+                if value is None:
+                    continue
+                self._latest = (value, time.monotonic())
+                self.samples += 1
+                produced = True
+                self.available = True
+                if self._stop.is_set():
+                    break
+        finally:
+            if process.poll() is None:
+                process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            process.stdout.close()
+            self._process = None
+        return produced
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "latest": self.latest(),
+            "samples": self.samples,
+            "restarts": self.restarts,
+        }
+
 
-    return 0.0
+_sampler: Optional[GpuSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_gpu_sampler() -> GpuSampler:
+    """Process-wide sampler, started on first use."""
+    global _sampler
+    sampler = _sampler
+    if sampler is not None:
+        return sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = GpuSampler()
+            _sampler.start()
+        return _sampler
+
+
+def get_gpu_load_percent() -> float:
+    return get_gpu_sampler().latest()
@@ -0,0 +1,216 @@
+import time
+from array import array
+from typing import Optional
+
+from .telemetry import TelemetrySample, TelemetrySubscription, get_telemetry_sampler
+
+
+HISTORY_METRICS = ("cpu", "ram", "gpu")
+
+
+class _SeriesRing:
+    """
+    Fixed-capacity ring of (time, cpu, ram, gpu) rows in typed arrays.
+
+    Rollup rings also keep the per-bucket maximum, so short spikes stay
+    visible after averaging.
+    """
+
+    def __init__(self, capacity: int, *, with_max: bool):
+        self.capacity = max(1, int(capacity))
+        self.times = array("d", bytes(8 * self.capacity))
+        self.means = {m: array("f", bytes(4 * self.capacity)) for m in HISTORY_METRICS}
+        self.maxes = {m: array("f", bytes(4 * self.capacity)) for m in HISTORY_METRICS} if with_max else None
+        self._head = 0
+        self.count = 0
+
+    def append(self, at: float, means: dict[str, float], maxes: Optional[dict[str, float]] = None):
+        i = self._head
+        self.times[i] = at
+        for metric in HISTORY_METRICS:
+            self.means[metric][i] = means[metric]
+            if self.maxes is not None:
+                self.maxes[metric][i] = maxes[metric]
+        self._head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _index(self, offset: int) -> int:
+        """Array index of the `offset`-th oldest row."""
+        return (self._head - self.count + offset) % self.capacity
+
+    def _first_at_or_after(self, at: float) -> int:
+        # Rows are appended in time order, so the logical sequence is sorted.
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[self._index(mid)] < at:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def rows(self, since: float, until: float):
+        """Indices of rows with since <= time <= until, oldest first."""
+        for offset in range(self._first_at_or_after(since), self.count):
+            i = self._index(offset)
+            if self.times[i] > until:
+                break
+            yield i
+
+    def nbytes(self) -> int:
+        arrays = [self.times, *self.means.values(), *(self.maxes or {}).values()]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+class _Bucket:
+    __slots__ = ("index", "sums", "maxes", "count")
+
+    def __init__(self):
+        self.index: Optional[int] = None
+        self.sums = dict.fromkeys(HISTORY_METRICS, 0.0)
+        self.maxes = dict.fromkeys(HISTORY_METRICS, 0.0)
+        self.count = 0
+
+
+class TelemetryHistory:
+    """
+    Multi-resolution CPU/RAM/GPU history in fixed memory.
+
+    Raw samples go into one ring; 10 s and 1 min means (with maxima) are
+    rolled up as samples arrive and kept in their own rings. All rings are
+    preallocated, so memory does not grow with uptime. Defaults keep
+    15 minutes raw (one sample per second), 6 hours at 10 s and 7 days at
+    1 minute, about 400 KiB in total.
+    """
+
+    RESOLUTIONS = {"raw": 0, "10s": 10, "1m": 60}
+
+    def __init__(
+        self,
+        *,
+        sample_interval: float = 1.0,
+        raw_capacity: int = 900,
+        capacity_10s: int = 2160,
+        capacity_1m: int = 10080,
+    ):
+        self.sample_interval = sample_interval
+        self._rings = {
+            "raw": _SeriesRing(raw_capacity, with_max=False),
+            "10s": _SeriesRing(capacity_10s, with_max=True),
+            "1m": _SeriesRing(capacity_1m, with_max=True),
+        }
+        self._buckets = {"10s": _Bucket(), "1m": _Bucket()}
+        self._subscription: Optional[TelemetrySubscription] = None
+
+    async def start(self):
+        if self._subscription is None:
+            self._subscription = get_telemetry_sampler().subscribe(self._on_sample, self.sample_interval)
+
+    async def stop(self):
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            await get_telemetry_sampler().unsubscribe(subscription)
+
+    async def _on_sample(self, sample: TelemetrySample):
+        self.add(time.time(), sample.cpu, sample.ram, sample.gpu)
+
+    def add(self, at: float, cpu: float, ram: float, gpu: float):
+        values = {"cpu": cpu, "ram": ram, "gpu": gpu}
+        self._rings["raw"].append(at, values)
+
+        for name, bucket in self._buckets.items():
+            width = self.RESOLUTIONS[name]
+            index = int(at // width)
+            if bucket.index is not None and index != bucket.index:
+                self._flush(name, bucket)
+            bucket.index = index
+            bucket.count += 1
+            for metric, value in values.items():
+                bucket.sums[metric] += value
+                bucket.maxes[metric] = max(bucket.maxes[metric], value)
+
+    def _flush(self, name: str, bucket: _Bucket):
+        if bucket.count:
+            width = self.RESOLUTIONS[name]
+            means = {metric: total / bucket.count for metric, total in bucket.sums.items()}
+            self._rings[name].append(bucket.index * width, means, dict(bucket.maxes))
+        bucket.sums = dict.fromkeys(HISTORY_METRICS, 0.0)
+        bucket.maxes = dict.fromkeys(HISTORY_METRICS, 0.0)
+        bucket.count = 0
+
+    def query(
+        self,
+        resolution: str = "raw",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> dict:
+        """
+        Rows between `since` and `until` (unix seconds) as parallel lists.
+
+        Rollup rows are stamped with their bucket start and carry `<metric>_max`.
+        """
+        if resolution not in self._rings:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        ring = self._rings[resolution]
+        since = float("-inf") if since is None else since
+        until = float("inf") if until is None else until
+
+        indices = list(ring.rows(since, until))
+        result = {
+            "resolution": resolution,
+            "t": [ring.times[i] for i in indices],
+        }
+        for metric in HISTORY_METRICS:
+            result[metric] = [round(ring.means[metric][i], 1) for i in indices]
+            if ring.maxes is not None:
+                result[f"{metric}_max"] = [round(ring.maxes[metric][i], 1) for i in indices]
+        return result
+
+    def downsample(self, window_sec: float, points: int) -> dict:
+        """
+        The last `window_sec` averaged into at most `points` buckets of whole
+        percents, read from the coarsest ring that still resolves them (or a
+        coarser one when a finer ring does not reach back far enough).
+        """
+        points = max(1, int(points))
+        window_sec = max(1.0, float(window_sec))
+        step = window_sec / points
+        if step >= 60 or window_sec > self._retention("10s"):
+            resolution = "1m"
+        elif step >= 10 or window_sec > self._retention("raw"):
+            resolution = "10s"
+        else:
+            resolution = "raw"
+
+        now = time.time()
+        start = now - window_sec
+        ring = self._rings[resolution]
+        sums = {metric: [0.0] * points for metric in HISTORY_METRICS}
+        counts = [0] * points
+        for i in ring.rows(start, now):
+            slot = min(points - 1, int((ring.times[i] - start) / step))
+            counts[slot] += 1
+            for metric in HISTORY_METRICS:
+                sums[metric][slot] += ring.means[metric][i]
+
+        # Leading empty slots (no data yet) are dropped; gaps repeat the previous value.
+        series = {metric: [] for metric in HISTORY_METRICS}
+        for slot in range(points):
+            if counts[slot] == 0:
+                if series["cpu"]:
+                    for metric in HISTORY_METRICS:
+                        series[metric].append(series[metric][-1])
+                continue
+            for metric in HISTORY_METRICS:
+                series[metric].append(int(round(sums[metric][slot] / counts[slot])))
+        return {"step": round(step, 3), **series}
+
+    def _retention(self, resolution: str) -> float:
+        width = self.RESOLUTIONS[resolution] or self.sample_interval
+        return self._rings[resolution].capacity * width
+
+    def stats(self) -> dict:
+        return {
+            name: {"rows": ring.count, "capacity": ring.capacity, "bytes": ring.nbytes()}
+            for name, ring in self._rings.items()
+        }
@@ -1,10 +1,17 @@
 from .event_bus import EventBus
 from .alive_services import AppContext
+from .settings import get_settings_store
 from ..modules.buses.service import BusService
 from ..modules.output.console import ConsoleOutput
 
 async def boot() -> EventBus:
+    # Upgrade settings.json once, before any service reads it.
+    get_settings_store().migrate()
+
     bus = EventBus()
+    AppContext.event_bus = bus
+    # Published only on change; a newly connected device needs the current value.
+    bus.retain("track_changed", "volume_changed", "device_presence")
 
     console = ConsoleOutput(show_album=True)
     bus.subscribe("track_changed", console.on_track)
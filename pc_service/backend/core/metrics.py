@@ -0,0 +1,77 @@
+from bisect import bisect_left
+
+
+# Upper bounds in seconds, from a fast console print to a send stuck behind a transfer.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; `observe` is one bisect and two additions.
+
+    Bucket counts are stored per bucket and made cumulative only when
+    rendered, so recording stays cheap enough to leave on.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One extra slot for values above the last bound (+Inf).
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class PrometheusText:
+    """Builder for the Prometheus text exposition format (version 0.0.4)."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._lines: list[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help_text: str, samples):
+        """`samples`: iterable of (labels dict, value)."""
+        self._header(name, "counter", help_text)
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {value}")
+
+    def gauge(self, name: str, help_text: str, samples):
+        self._header(name, "gauge", help_text)
+        for labels, value in samples:
+            self._lines.append(f"{name}{_labels(labels)} {value}")
+
+    def histogram(self, name: str, help_text: str, samples):
+        """`samples`: iterable of (labels dict, Histogram)."""
+        self._header(name, "histogram", help_text)
+        for labels, histogram in samples:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                self._lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            self._lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            self._lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            self._lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
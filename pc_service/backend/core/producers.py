@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+
+ProducerHook = Callable[[], Awaitable[None]]
+
+
+class _Producer:
+    __slots__ = ("name", "resume", "suspend", "active", "since", "resumes", "suspends")
+
+    def __init__(self, name: str, resume: ProducerHook, suspend: ProducerHook, active: bool):
+        self.name = name
+        self.resume = resume
+        self.suspend = suspend
+        self.active = active
+        self.since = time.time()
+        self.resumes = 0
+        self.suspends = 0
+
+
+class ProducerManager:
+    """
+    Runs producer services only while a device is there to consume them.
+
+    Presence comes from the retained `device_presence` bus event. When the
+    last device leaves, producers keep running for `grace_sec` (a reboot or
+    Wi-Fi hiccup reconnects well within it) and are then suspended; the next
+    connection resumes them. Producers are registered already running, so
+    the grace period also applies from startup.
+    """
+
+    def __init__(self, bus, *, grace_sec: float = 30.0):
+        self.bus = bus
+        self.grace_sec = max(0.0, float(grace_sec))
+        self._producers: dict[str, _Producer] = {}
+        self._present = False
+        self._clients = 0
+        self._suspend_task: Optional[asyncio.Task] = None
+        self._suspend_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def register(self, name: str, *, resume: ProducerHook, suspend: ProducerHook, active: bool = True):
+        self._producers[name] = _Producer(name, resume, suspend, active)
+
+    async def start(self):
+        self.bus.subscribe("device_presence", self.on_presence)
+        if not self._present:
+            self._schedule_suspend()
+
+    async def on_presence(self, event: dict):
+        self._clients = int(event.get("clients", 0))
+        present = self._clients > 0
+        if present == self._present:
+            return
+        self._present = present
+
+        if present:
+            self._cancel_suspend()
+            await self._set_all(True)
+        else:
+            self._schedule_suspend()
+
+    def _schedule_suspend(self):
+        self._cancel_suspend()
+        self._suspend_at = time.time() + self.grace_sec
+        self._suspend_task = asyncio.create_task(self._suspend_after_grace())
+
+    def _cancel_suspend(self):
+        if self._suspend_task is not None and not self._suspend_task.done():
+            self._suspend_task.cancel()
+        self._suspend_task = None
+        self._suspend_at = None
+
+    async def _suspend_after_grace(self):
+        await asyncio.sleep(self.grace_sec)
+        # Past this point a reconnect waits for the suspend instead of cancelling it.
+        self._suspend_task = None
+        self._suspend_at = None
+        await self._set_all(False)
+
+    async def _set_all(self, active: bool):
+        async with self._lock:
+            changed = 0
+            for producer in self._producers.values():
+                if producer.active == active:
+                    continue
+                try:
+                    if active:
+                        await producer.resume()
+                        producer.resumes += 1
+                    else:
+                        await producer.suspend()
+                        producer.suspends += 1
+                except Exception as e:
+                    print(f"Producer {producer.name} failed to {'resume' if active else 'suspend'}: {e}")
+                    continue
+                producer.active = active
+                producer.since = time.time()
+                changed += 1
+            if changed:
+                print(f"Producers {'resumed' if active else 'suspended'}: {changed}")
+
+    def status(self) -> dict:
+        return {
+            "device_present": self._present,
+            "clients": self._clients,
+            "grace_sec": self.grace_sec,
+            "suspend_in_sec": round(max(0.0, self._suspend_at - time.time()), 1) if self._suspend_at else None,
+            "producers": {
+                producer.name: {
+                    "active": producer.active,
+                    "since": producer.since,
+                    "resumes": producer.resumes,
+                    "suspends": producer.suspends,
+                }
+                for producer in self._producers.values()
+            },
+        }
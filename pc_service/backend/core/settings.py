@@ -0,0 +1,502 @@
+import asyncio
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from .paths import data_path
+from .settings_migrations import SCHEMA_VERSION, MigrationContext, deep_merge, migrate_settings
+
+
+DEFAULT_SETTINGS = {
+    "wifi": {"ssid": "", "password": ""},
+    "weather": {
+        "api_key": "",
+        "latitude": "55.7558",
+        "longitude": "37.6173",
+        "timeout_sec": 1800,
+    },
+    "display": {
+        "brightness": 180,
+        "weather_dependent": False,
+        "off_time": "23:00",
+        "on_time": "07:00",
+        "accent_color": "#FFAA00",
+    },
+    "backlight": {
+        "brightness": 180,
+        "mode": "5",
+        "led_mode": 5,
+        "weather_dependent": False,
+        "color": "#33CCFF",
+    },
+    "schedule": {
+        "start_time": "07:30",
+        "end_time": "19:30",
+        "sources": [
+            {"url": "", "stop_name": "", "bus_number": ""},
+            {"url": "", "stop_name": "", "bus_number": ""},
+            {"url": "", "stop_name": "", "bus_number": ""},
+            {"url": "", "stop_name": "", "bus_number": ""},
+        ],
+    },
+    "ota": {
+        "url": "",
+        "firmware_path": "",
+    },
+    "network": {
+        "ws_port": 8765,
+        "udp_port": 45678,
+    },
+    "ui_colors": {},
+}
+HEX_COLOR_RE = re.compile(r"^#?[0-9A-Fa-f]{6}$")
+
+SETTINGS_PATH = data_path("backend", "storage", "settings.json")
+LEGACY_UI_SETTINGS_PATH = data_path("backend", "storage", "ui_settings.json")
+
+
+def normalize_settings(data: dict[str, Any]) -> dict[str, Any]:
+    """Fill defaults and coerce values; legacy layouts are handled once by `SettingsStore.migrate()`."""
+    normalized = deep_merge(deepcopy(DEFAULT_SETTINGS), deepcopy(data))
+
+    display = normalized.get("display", {})
+    backlight = normalized.get("backlight", {})
+
+    backlight["mode"] = str(backlight.get("mode", "5"))
+    try:
+        backlight["led_mode"] = int(backlight.get("led_mode", backlight.get("mode", 5)))
+    except (TypeError, ValueError):
+        backlight["led_mode"] = 5
+
+    display["brightness"] = clamp_brightness(display.get("brightness", 180))
+    backlight["brightness"] = clamp_brightness(backlight.get("brightness", 180))
+
+    display["weather_dependent"] = bool(display.get("weather_dependent", False))
+    backlight["weather_dependent"] = bool(backlight.get("weather_dependent", False))
+
+    schedule = normalized.get("schedule", {})
+    schedule_sources = normalize_schedule_sources(schedule.get("sources", []))
+    schedule["sources"] = schedule_sources
+    schedule["start_time"] = normalize_time(schedule.get("start_time", "07:30"), "07:30")
+    schedule["end_time"] = normalize_time(schedule.get("end_time", "19:30"), "19:30")
+
+    normalized["display"] = display
+    normalized["backlight"] = backlight
+    normalized["schedule"] = schedule
+    normalized["ota"] = {
+        "url": str(normalized.get("ota", {}).get("url", "")).strip(),
+        "firmware_path": str(normalized.get("ota", {}).get("firmware_path", "")).strip(),
+    }
+    normalized["network"] = {
+        "ws_port": normalize_port(normalized.get("network", {}).get("ws_port", 8765), 8765),
+        "udp_port": normalize_port(normalized.get("network", {}).get("udp_port", 45678), 45678),
+    }
+    normalized["ui_colors"] = normalize_ui_colors(normalized.get("ui_colors", {}))
+
+    return normalized
+
+
+def normalize_ui_colors(raw_ui_colors: Any) -> dict[str, dict[str, str]]:
+    normalized: dict[str, dict[str, str]] = {}
+    if not isinstance(raw_ui_colors, dict):
+        return normalized
+
+    for screen, elements in raw_ui_colors.items():
+        screen_key = str(screen or "").strip()
+        if not screen_key or not isinstance(elements, dict):
+            continue
+
+        normalized_elements: dict[str, str] = {}
+        for element, color in elements.items():
+            element_key = str(element or "").strip()
+            color_hex = normalize_hex_color(color)
+            if not element_key or not color_hex:
+                continue
+            normalized_elements[element_key] = color_hex
+
+        if normalized_elements:
+            normalized[screen_key] = normalized_elements
+
+    return normalized
+
+
+def normalize_hex_color(value: Any) -> str:
+    raw = str(value or "").strip()
+    if not raw:
+        return ""
+    if not HEX_COLOR_RE.fullmatch(raw):
+        return ""
+    prefixed = raw if raw.startswith("#") else f"#{raw}"
+    return prefixed.upper()
+
+
+def normalize_schedule_sources(raw_sources: Any) -> list[dict[str, str]]:
+    normalized: list[dict[str, str]] = []
+    for entry in raw_sources or []:
+        if isinstance(entry, str):
+            normalized.append({"url": entry.strip(), "stop_name": "", "bus_number": ""})
+        elif isinstance(entry, dict):
+            normalized.append(
+                {
+                    "url": str(entry.get("url", "")).strip(),
+                    "stop_name": str(entry.get("stop_name", entry.get("name", ""))).strip(),
+                    "bus_number": str(entry.get("bus_number", entry.get("name", ""))).strip(),
+                }
+            )
+
+    while len(normalized) < 4:
+        normalized.append({"url": "", "stop_name": "", "bus_number": ""})
+    return normalized[:4]
+
+
+def normalize_time(value: Any, fallback: str) -> str:
+    raw = str(value or "").strip()
+    try:
+        parts = raw.split(":")
+        if len(parts) != 2:
+            return fallback
+        hours = int(parts[0])
+        minutes = int(parts[1])
+        if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+            return fallback
+        return f"{hours:02d}:{minutes:02d}"
+    except Exception:
+        return fallback
+
+
+def clamp_brightness(value: Any) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 180
+    return max(0, min(number, 255))
+
+
+def normalize_port(value: Any, fallback: int) -> int:
+    try:
+        port = int(value)
+    except (TypeError, ValueError):
+        port = fallback
+    return max(1, min(65535, port))
+
+
+def _read_only(*_args, **_kwargs):
+    raise TypeError("settings snapshots are read-only; deepcopy() one to modify it")
+
+
+class FrozenDict(dict):
+    """A dict that refuses changes; `deepcopy()` returns a plain, mutable copy."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list that refuses changes; `deepcopy()` returns a plain, mutable copy."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        frozen = FrozenDict()
+        for key, item in value.items():
+            dict.__setitem__(frozen, key, freeze(item))
+        return frozen
+    if isinstance(value, list):
+        frozen = FrozenList()
+        list.extend(frozen, (freeze(item) for item in value))
+        return frozen
+    return value
+
+
+SettingsCallback = Callable[[FrozenDict], None]
+
+
+class SettingsStore:
+    """
+    The normalized settings.json, shared by every service in the process.
+
+    `snapshot()` costs one stat() per call: the file is parsed and
+    normalized again only when its mtime or size changed. Snapshots are
+    read-only (they still serialize like plain dicts), so callers can hold
+    on to them without copying; `deepcopy()` gives a mutable copy to edit
+    and `save()` back. Subscribers are called with the new snapshot
+    whenever the document changes, whether through `save()` or an edit of
+    the file on disk.
+
+    `save()` is write-behind: the snapshot changes at once, and the file
+    is written in a worker thread once saves have been quiet for
+    `flush_delay_sec`, but no later than `max_delay_sec` after the first
+    unwritten one, so a burst of edits costs one write. Each write goes to
+    a temporary file that replaces settings.json, so a crash leaves either
+    the old or the new document. `flush()` writes pending changes now and
+    must run on shutdown.
+    """
+
+    def __init__(
+        self,
+        path: Path = SETTINGS_PATH,
+        *,
+        flush_delay_sec: float = 0.5,
+        max_delay_sec: float = 2.0,
+    ):
+        self.path = Path(path)
+        self.flush_delay_sec = max(0.0, float(flush_delay_sec))
+        self.max_delay_sec = max(self.flush_delay_sec, float(max_delay_sec))
+        self._snapshot: Optional[FrozenDict] = None
+        self._signature: Optional[tuple] = None
+        self._subscribers: list[SettingsCallback] = []
+        self._lock = threading.Lock()
+        # Serializes file writes; held without `_lock` so readers never wait on disk.
+        self._write_lock = threading.Lock()
+        # Bumped by every save; a write only clears `_dirty` if no save came in meanwhile.
+        self._generation = 0
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._changed_at = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        self.saves = 0
+        self.writes = 0
+        self.write_errors = 0
+        self.last_write_ms: Optional[float] = None
+
+    def subscribe(self, callback: SettingsCallback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: SettingsCallback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def snapshot(self) -> FrozenDict:
+        with self._lock:
+            if self._dirty:
+                # The file is older than the snapshot until the pending write lands.
+                return self._snapshot
+            signature = self._stat()
+            if self._snapshot is not None and signature == self._signature:
+                return self._snapshot
+            loaded = self._read(self.path)
+            if loaded is None:
+                # Unreadable (for example caught mid-write): keep the last good
+                # document and try again on the next call.
+                if self._snapshot is not None:
+                    return self._snapshot
+                loaded = {}
+            self._signature = signature
+            self.reloads += 1
+            changed = self._replace(normalize_settings(loaded))
+            snapshot = self._snapshot
+        if changed:
+            self._notify(snapshot)
+        return snapshot
+
+    def save(self, document: dict[str, Any]) -> FrozenDict:
+        """Make an already normalized document current and schedule its write."""
+        with self._lock:
+            self.saves += 1
+            changed = self._replace(document)
+            snapshot = self._snapshot
+            if changed:
+                now = time.monotonic()
+                if not self._dirty:
+                    self._dirty = True
+                    self._dirty_since = now
+                self._changed_at = now
+                self._generation += 1
+        if changed:
+            self._schedule_flush()
+            self._notify(snapshot)
+        return snapshot
+
+    def _schedule_flush(self):
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        except RuntimeError:
+            # No event loop (scripts, shutdown): write right away.
+            self.flush_sync()
+
+    async def _flush_later(self):
+        # Loops because saves made during a write leave the store dirty.
+        while self._dirty:
+            now = time.monotonic()
+            due = min(self._changed_at + self.flush_delay_sec, self._dirty_since + self.max_delay_sec)
+            if now < due:
+                await asyncio.sleep(due - now)
+                continue
+            errors = self.write_errors
+            await self.flush()
+            if self.write_errors != errors:
+                # Left dirty; the next save or the shutdown flush retries.
+                return
+
+    async def flush(self):
+        """Write pending changes now, in a worker thread."""
+        if self._dirty:
+            await asyncio.to_thread(self.flush_sync)
+
+    def flush_sync(self):
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                document = self._snapshot
+                generation = self._generation
+
+            started = time.perf_counter()
+            try:
+                self._write_atomic(document)
+            except OSError as e:
+                self.write_errors += 1
+                print("Failed to write settings:", e)
+                # Still dirty: the next save or flush tries again.
+                return
+            self.writes += 1
+            self.last_write_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            with self._lock:
+                self._signature = self._stat()
+                if generation == self._generation:
+                    self._dirty = False
+
+    def migrate(self, legacy_ui_settings_path: Path = LEGACY_UI_SETTINGS_PATH) -> list[str]:
+        """
+        Bring settings.json up to `SCHEMA_VERSION` before anything reads it.
+
+        Runs the pending migrations on the raw file, writes the result
+        synchronously and archives the legacy files it absorbed. A file that
+        is already current is only read. Returns the migrations applied.
+        """
+        with self._write_lock:
+            raw = self._read(self.path)
+            if raw is None:
+                print("settings.json is unreadable, skipping migration")
+                return []
+
+            ctx = MigrationContext(legacy_ui_settings_path=Path(legacy_ui_settings_path))
+            applied = migrate_settings(raw, ctx)
+            if not applied:
+                return []
+
+            document = normalize_settings(raw)
+            self._write_atomic(document)
+            with self._lock:
+                self._signature = self._stat()
+                self._replace(document)
+
+        for path in ctx.archive:
+            archived = path.with_name(path.name + ".migrated")
+            try:
+                os.replace(path, archived)
+            except OSError as e:
+                print(f"Failed to archive {path.name}: {e}")
+        print(f"Settings migrated to schema {SCHEMA_VERSION}: {', '.join(applied)}")
+        return applied
+
+    def _write_atomic(self, document: dict[str, Any]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            for attempt in range(3):
+                try:
+                    os.replace(tmp_path, self.path)
+                    break
+                except PermissionError:
+                    # Windows refuses while another process (an editor, antivirus) has the file open.
+                    if attempt == 2:
+                        raise
+                    time.sleep(0.05)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def _replace(self, document: dict[str, Any]) -> bool:
+        if self._snapshot is not None and self._snapshot == document:
+            return False
+        self._snapshot = freeze(document)
+        return True
+
+    def _notify(self, snapshot: FrozenDict):
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print("Settings subscriber failed:", e)
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _read(path: Path) -> Optional[dict[str, Any]]:
+        """The JSON object in `path`, {} if the file is missing, None if it cannot be parsed."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "reloads": self.reloads,
+            "saves": self.saves,
+            "writes": self.writes,
+            "write_errors": self.write_errors,
+            "last_write_ms": self.last_write_ms,
+            "pending": self._dirty,
+            "subscribers": len(self._subscribers),
+        }
+
+
+_store: Optional[SettingsStore] = None
+
+
+def get_settings_store() -> SettingsStore:
+    """Process-wide settings store shared by every service."""
+    global _store
+    if _store is None:
+        _store = SettingsStore()
+        # Last resort for exits that skip the async shutdown path.
+        atexit.register(_store.flush_sync)
+    return _store
@@ -0,0 +1,124 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+
+def deep_merge(base: dict[str, Any], patch: dict[str, Any]) -> dict[str, Any]:
+    for k, v in patch.items():
+        if k in base and isinstance(base[k], dict) and isinstance(v, dict):
+            base[k] = deep_merge(base[k], v)
+        else:
+            base[k] = v
+    return base
+
+
+@dataclass
+class MigrationContext:
+    legacy_ui_settings_path: Path
+    # Files the migrated document replaces; archived once it is on disk.
+    archive: list[Path] = field(default_factory=list)
+
+
+def _merge_legacy_ui_settings(document: dict[str, Any], ctx: MigrationContext):
+    """Fold the old ui_settings.json in; settings.json wins on conflicts."""
+    path = ctx.legacy_ui_settings_path
+    if not path.exists():
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Skipping unreadable {path.name}: {e}")
+        return
+    if isinstance(legacy, dict):
+        merged = deep_merge(legacy, dict(document))
+        document.clear()
+        document.update(merged)
+    ctx.archive.append(path)
+
+
+def _move_display_backlight_fields(document: dict[str, Any], _ctx: MigrationContext):
+    """display.backlight/mode/led_mode moved to the backlight block, auto_brightness became weather_dependent."""
+    display = document.get("display")
+    if not isinstance(display, dict):
+        return
+    backlight = document.get("backlight")
+    if not isinstance(backlight, dict):
+        backlight = document["backlight"] = {}
+
+    if "backlight" in display:
+        backlight.setdefault("brightness", display.pop("backlight"))
+    if "mode" in display:
+        backlight.setdefault("mode", str(display.pop("mode")))
+    if "led_mode" in display:
+        led_mode = display.pop("led_mode")
+        try:
+            backlight.setdefault("led_mode", int(led_mode))
+        except (TypeError, ValueError):
+            pass
+    if "auto_brightness" in display:
+        display.setdefault("weather_dependent", bool(display.pop("auto_brightness")))
+
+
+def _move_bus_settings_to_schedule(document: dict[str, Any], _ctx: MigrationContext):
+    """The bus service's own bus_settings block is replaced by schedule, which it used to override."""
+    bus_settings = document.pop("bus_settings", None)
+    if not isinstance(bus_settings, dict):
+        return
+    schedule = document.get("schedule")
+    if not isinstance(schedule, dict):
+        schedule = document["schedule"] = {}
+
+    interval = bus_settings.get("time_interval")
+    if isinstance(interval, dict):
+        if "start" in interval:
+            schedule["start_time"] = interval["start"]
+        if "end" in interval:
+            schedule["end_time"] = interval["end"]
+
+    stops = bus_settings.get("stops")
+    if isinstance(stops, list) and stops:
+        schedule["sources"] = [
+            {
+                "url": str(stop.get("url", "")).strip(),
+                "stop_name": str(stop.get("stop_name", "")).strip(),
+                "bus_number": str(stop.get("name", "")).strip(),
+            }
+            for stop in stops
+            if isinstance(stop, dict)
+        ]
+
+
+# (version, description, migration). A document at version N has had every
+# migration up to N applied; append new ones with the next number.
+MIGRATIONS: list[tuple[int, str, Callable[[dict[str, Any], MigrationContext], None]]] = [
+    (1, "merge ui_settings.json", _merge_legacy_ui_settings),
+    (2, "display backlight fields -> backlight", _move_display_backlight_fields),
+    (3, "bus_settings -> schedule", _move_bus_settings_to_schedule),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(document: dict[str, Any]) -> int:
+    try:
+        return max(0, int(document.get("schema_version", 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def migrate_settings(document: dict[str, Any], ctx: MigrationContext) -> list[str]:
+    """Upgrade a raw settings document in place; return the migrations applied."""
+    version = schema_version(document)
+    if version > SCHEMA_VERSION:
+        print(f"settings.json has schema {version}, newer than {SCHEMA_VERSION}; leaving it as is")
+        return []
+
+    applied = []
+    for target, description, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        migration(document, ctx)
+        document["schema_version"] = target
+        applied.append(description)
+    return applied
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import psutil
+
+from .gpu import get_gpu_load_percent, get_gpu_sampler
+
+
+@dataclass(frozen=True, slots=True)
+class TelemetrySample:
+    cpu: float
+    ram: float
+    gpu: float
+    # time.monotonic() when the sample was taken.
+    taken_at: float
+
+
+TelemetryCallback = Callable[[TelemetrySample], Awaitable[None]]
+
+
+class TelemetrySubscription:
+    def __init__(self, callback: TelemetryCallback, interval: float, next_due: float):
+        self.callback = callback
+        self.interval = interval
+        self.next_due = next_due
+        # CPU time-weighted over the ticks since the last delivery, so a slow
+        # subscriber sees its own window rather than the last fast tick.
+        self._cpu_weighted = 0.0
+        self._cpu_seconds = 0.0
+        self._delivery: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.skipped = 0
+
+    def _accumulate(self, cpu: float, seconds: float):
+        self._cpu_weighted += cpu * seconds
+        self._cpu_seconds += seconds
+
+    def _window_cpu(self, fallback: float) -> float:
+        if self._cpu_seconds <= 0:
+            return fallback
+        cpu = self._cpu_weighted / self._cpu_seconds
+        self._cpu_weighted = 0.0
+        self._cpu_seconds = 0.0
+        return round(cpu, 1)
+
+
+class TelemetrySampler:
+    """
+    Single owner of the psutil and GPU readings.
+
+    `psutil.cpu_percent(interval=None)` measures since its previous call, so
+    two loops calling it skew each other. Here one task takes a sample at the
+    fastest rate any subscriber asked for, reads it in a worker thread, and
+    hands each subscriber a sample at its own interval. The number of system
+    calls depends only on that fastest rate, not on how many subscribers
+    there are.
+
+    A subscriber whose previous callback is still running skips the
+    delivery instead of queueing it, so a slow consumer never delays the
+    sampler or the others.
+    """
+
+    MIN_INTERVAL_SEC = 0.1
+
+    def __init__(self):
+        self._subscriptions: list[TelemetrySubscription] = []
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.latest: Optional[TelemetrySample] = None
+        self.samples = 0
+
+    def subscribe(self, callback: TelemetryCallback, interval: float) -> TelemetrySubscription:
+        """Deliver a sample to `callback` every `interval` seconds until unsubscribed."""
+        interval = max(self.MIN_INTERVAL_SEC, float(interval))
+        subscription = TelemetrySubscription(callback, interval, time.monotonic() + interval)
+        self._subscriptions.append(subscription)
+
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        self._changed.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def set_interval(self, subscription: TelemetrySubscription, interval: float):
+        """Change a subscriber's rate; a shorter interval takes effect right away."""
+        interval = max(self.MIN_INTERVAL_SEC, float(interval))
+        if interval == subscription.interval:
+            return
+        due = subscription.next_due - subscription.interval + interval
+        subscription.interval = interval
+        subscription.next_due = due
+        if self._changed is not None:
+            self._changed.set()
+
+    async def unsubscribe(self, subscription: TelemetrySubscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        delivery = subscription._delivery
+        if delivery is not None and not delivery.done():
+            await delivery
+        if self._changed is not None:
+            self._changed.set()
+
+    @staticmethod
+    def _read() -> tuple[float, float, float]:
+        return (
+            psutil.cpu_percent(interval=None),
+            psutil.virtual_memory().percent,
+            get_gpu_load_percent(),
+        )
+
+    async def _run(self):
+        while self._subscriptions:
+            await self._sample_while_subscribed()
+            # Without subscribers nothing reads the GPU; stop its child process too.
+            # Someone may subscribe meanwhile, hence the loop.
+            await asyncio.to_thread(get_gpu_sampler().stop)
+
+    async def _sample_while_subscribed(self):
+        get_gpu_sampler().start()
+        # Prime cpu_percent so the first real sample covers a full interval.
+        await asyncio.to_thread(psutil.cpu_percent, None)
+        previous_at = time.monotonic()
+
+        while self._subscriptions:
+            next_due = min(sub.next_due for sub in self._subscriptions)
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                    # Subscriptions changed: recompute the next due time.
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+
+            cpu, ram, gpu = await asyncio.to_thread(self._read)
+            now = time.monotonic()
+            self.latest = TelemetrySample(cpu=cpu, ram=ram, gpu=gpu, taken_at=now)
+            self.samples += 1
+            elapsed, previous_at = now - previous_at, now
+
+            for sub in list(self._subscriptions):
+                sub._accumulate(cpu, elapsed)
+                # Ticks land a little late; treat "almost due" as due.
+                if sub.next_due - now > self.MIN_INTERVAL_SEC / 2:
+                    continue
+                sub.next_due = max(sub.next_due + sub.interval, now + sub.interval / 2)
+                if sub._delivery is not None and not sub._delivery.done():
+                    sub.skipped += 1
+                    continue
+                sample = TelemetrySample(cpu=sub._window_cpu(cpu), ram=ram, gpu=gpu, taken_at=now)
+                sub._delivery = asyncio.create_task(self._deliver(sub, sample))
+
+    @staticmethod
+    async def _deliver(sub: TelemetrySubscription, sample: TelemetrySample):
+        try:
+            await sub.callback(sample)
+            sub.delivered += 1
+        except Exception as e:
+            print(f"Telemetry subscriber error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "subscribers": [
+                {
+                    "interval_sec": sub.interval,
+                    "delivered": sub.delivered,
+                    "skipped": sub.skipped,
+                }
+                for sub in self._subscriptions
+            ],
+        }
+
+
+_sampler: Optional[TelemetrySampler] = None
+
+
+def get_telemetry_sampler() -> TelemetrySampler:
+    """Process-wide sampler shared by every telemetry consumer."""
+    global _sampler
+    if _sampler is None:
+        _sampler = TelemetrySampler()
+    return _sampler
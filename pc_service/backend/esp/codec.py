@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+
+import msgpack
+
+
+class JsonCodec:
+    """Text frames with JSON; understood by every firmware version."""
+
+    name = "json"
+
+    def encode(self, data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False)
+
+    def batch(self, items: list[str]) -> str:
+        return '{"type":"batch","items":[' + ",".join(items) + "]}"
+
+    def wrap_stream(self, chunk: bytes) -> bytes:
+        return chunk
+
+
+class MsgpackCodec:
+    """
+    Binary frames with MessagePack, parsed on the device by
+    `deserializeMsgPack` without any text scanning.
+
+    Once a connection switches to this codec every binary frame is a
+    MessagePack value, so raw stream data (GIF chunks) is wrapped in a `bin`
+    header and the firmware can tell data from commands.
+    """
+
+    name = "msgpack"
+
+    def encode(self, data: dict) -> bytes:
+        # float32 is plenty for percentages and keeps pc_load compact.
+        return msgpack.packb(data, use_bin_type=True, use_single_float=True)
+
+    def batch(self, items: list[bytes]) -> bytes:
+        # Items are already packed maps, so the envelope is spliced around them.
+        count = len(items)
+        if count < 16:
+            header = bytes((0x90 | count,))
+        else:
+            header = b"\xdc" + count.to_bytes(2, "big")
+        return b"\x82\xa4type\xa5batch\xa5items" + header + b"".join(items)
+
+    def wrap_stream(self, chunk: bytes) -> bytes:
+        size = len(chunk)
+        if size < 0x100:
+            header = b"\xc4" + bytes((size,))
+        elif size < 0x10000:
+            header = b"\xc5" + size.to_bytes(2, "big")
+        else:
+            header = b"\xc6" + size.to_bytes(4, "big")
+        return header + chunk
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec()
@@ -6,10 +6,22 @@ from typing import Awaitable, Callable, Optional
 import websockets
 
 from backend.core.network import resolve_local_ip, wait_for_internet
+from .codec import JSON_CODEC, MSGPACK_CODEC
+from .outbox import MESSAGE_PRIORITIES, OUTBOX_COUNTERS, ClientOutbox, Priority, coalesce_key
 
 
 MessageHandler = Callable[[str], Awaitable[None]]
 ConnectHandler = Callable[[], Awaitable[None]]
+DisconnectHandler = Callable[[], Awaitable[None]]
+HelloHandler = Callable[[frozenset[str]], Awaitable[None]]
+
+# Per-chunk transfer acknowledgements are too chatty for the console log.
+QUIET_MESSAGE_PREFIXES = ('{"type":"gif_ack"',)
+# Sent by the firmware right after connecting: {"type":"hello","caps":[...]}.
+# Until it is handled the client gets plain, unbatched JSON. The reply
+# {"type":"hello","codec":...} is written on its own before `batch` and
+# MessagePack are enabled.
+HELLO_PREFIX = '{"type":"hello"'
 
 
 class ESPConnection:
@@ -22,6 +34,7 @@ class ESPConnection:
         udp_interval_sec: float = 1.5,
         ws_ping_interval_sec: float = 10.0,
         ws_ping_timeout_sec: float = 10.0,
+        use_msgpack: bool = True,
     ):
         self.host = host
         self.port = int(port)
@@ -29,10 +42,18 @@ class ESPConnection:
         self.udp_interval_sec = float(max(0.5, udp_interval_sec))
         self.ws_ping_interval_sec = float(max(3.0, ws_ping_interval_sec))
         self.ws_ping_timeout_sec = float(max(3.0, ws_ping_timeout_sec))
+        self.use_msgpack = bool(use_msgpack)
 
         self.clients = set()
+        self._outboxes: dict[object, ClientOutbox] = {}
+        # Outbound counters of clients that already disconnected.
+        self._closed_totals = dict.fromkeys(OUTBOX_COUNTERS, 0)
+        self.connections = 0
+        self.received = 0
         self._on_message: Optional[MessageHandler] = None
         self._on_connect: Optional[ConnectHandler] = None
+        self._on_disconnect: Optional[DisconnectHandler] = None
+        self._on_hello: Optional[HelloHandler] = None
         self._udp_socket: Optional[socket.socket] = None
         self._udp_task: Optional[asyncio.Task] = None
 
@@ -40,6 +61,8 @@ class ESPConnection:
         self,
         on_message: Optional[MessageHandler] = None,
         on_connect: Optional[ConnectHandler] = None,
+        on_disconnect: Optional[DisconnectHandler] = None,
+        on_hello: Optional[HelloHandler] = None,
     ):
         """
         Start websocket server.
@@ -49,6 +72,8 @@ class ESPConnection:
         """
         self._on_message = on_message
         self._on_connect = on_connect
+        self._on_disconnect = on_disconnect
+        self._on_hello = on_hello
         await wait_for_internet()
 
         self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -56,38 +81,39 @@ class ESPConnection:
         self._udp_socket.setblocking(False)
 
         async def handler(ws):
-            self.clients.add(ws)
+            self.add_client(ws)
             print("ESP connected")
-            if self._on_connect is not None:
-                try:
-                    await self._on_connect()
-                except Exception as e:
-                    print("Error in ESP on_connect handler:", e)
-
-            await ws.send(
-                json.dumps(
+
+            try:
+                # Not waiting for hello: the burst goes out as plain JSON and
+                # the capabilities apply once the hello is read below.
+                if self._on_connect is not None:
+                    try:
+                        await self._on_connect()
+                    except Exception as e:
+                        print("Error in ESP on_connect handler:", e)
+
+                await self.send_json(
+                    ws,
                     {
                         "type": "get_schedule_data",
                     },
-                    ensure_ascii=False,
                 )
-            )
 
-            try:
                 async for msg in ws:
-                    print("ESP -> PC:", msg)
-                    if self._on_message is not None:
-                        try:
-                            await self._on_message(msg)
-                        except Exception as e:
-                            print("Error in ESP on_message handler:", e)
+                    await self._dispatch(ws, msg)
             except websockets.exceptions.ConnectionClosed as e:
                 code = getattr(e, "code", None)
                 reason = getattr(e, "reason", "")
                 print(f"ESP websocket closed: code={code}, reason={reason or 'no close reason'}")
             finally:
-                self.clients.discard(ws)
+                await self.remove_client(ws)
                 print("ESP disconnected")
+                if self._on_disconnect is not None:
+                    try:
+                        await self._on_disconnect()
+                    except Exception as e:
+                        print("Error in ESP on_disconnect handler:", e)
 
         self.server = await websockets.serve(
             handler,
@@ -100,6 +126,43 @@ class ESPConnection:
 
         self._udp_task = asyncio.create_task(self._udp_announce_loop())
 
+    async def _apply_hello(self, ws, msg) -> bool:
+        if not (isinstance(msg, str) and msg.startswith(HELLO_PREFIX)):
+            return False
+        try:
+            caps = json.loads(msg).get("caps") or []
+        except (json.JSONDecodeError, AttributeError):
+            caps = []
+        outbox = self._outboxes.get(ws)
+        if outbox is None or not isinstance(caps, list):
+            return True
+
+        capabilities = frozenset(str(cap) for cap in caps)
+        codec = MSGPACK_CODEC if self.use_msgpack and "msgpack" in capabilities else JSON_CODEC
+        # Written before `batch` is enabled, so it is never packed into a batch frame.
+        await outbox.send(JSON_CODEC.encode({"type": "hello", "codec": codec.name}), Priority.CONTROL)
+        outbox.capabilities = capabilities
+        outbox.codec = codec
+        print(f"ESP capabilities: {sorted(capabilities)}, codec: {codec.name}")
+        if self._on_hello is not None:
+            try:
+                await self._on_hello(capabilities)
+            except Exception as e:
+                print("Error in ESP on_hello handler:", e)
+        return True
+
+    async def _dispatch(self, ws, msg):
+        self.received += 1
+        if await self._apply_hello(ws, msg):
+            return
+        if not (isinstance(msg, str) and msg.startswith(QUIET_MESSAGE_PREFIXES)):
+            print("ESP -> PC:", msg)
+        if self._on_message is not None:
+            try:
+                await self._on_message(msg)
+            except Exception as e:
+                print("Error in ESP on_message handler:", e)
+
     async def _udp_announce_loop(self):
         while True:
             await asyncio.sleep(self.udp_interval_sec)
@@ -121,17 +184,76 @@ class ESPConnection:
             except Exception as e:
                 print("UDP discovery send failed:", e)
 
-    async def broadcast_json(self, data: dict):
-        if not self.clients:
+    def add_client(self, ws):
+        self.clients.add(ws)
+        self._outboxes[ws] = ClientOutbox(ws)
+        self.connections += 1
+
+    async def remove_client(self, ws):
+        self.clients.discard(ws)
+        outbox = self._outboxes.pop(ws, None)
+        if outbox is not None:
+            await outbox.close()
+            for name in OUTBOX_COUNTERS:
+                self._closed_totals[name] += getattr(outbox, name)
+
+    async def send_json(self, ws, data: dict, priority: Optional[Priority] = None):
+        outbox = self._outboxes.get(ws)
+        if outbox is None:
             return
+        await outbox.send(outbox.codec.encode(data), self._priority_for(data, priority), coalesce_key(data))
 
-        message = json.dumps(data, ensure_ascii=False)
-        await asyncio.gather(*[ws.send(message) for ws in self.clients])
+    async def broadcast_json(self, data: dict, priority: Optional[Priority] = None):
+        """Send a command to every client, encoded with each client's negotiated codec."""
+        if not self._outboxes:
+            return
+
+        encoded: dict[str, str | bytes] = {}
+        priority = self._priority_for(data, priority)
+        key = coalesce_key(data)
+        sends = []
+        for outbox in list(self._outboxes.values()):
+            codec = outbox.codec
+            if codec.name not in encoded:
+                encoded[codec.name] = codec.encode(data)
+            sends.append(outbox.send(encoded[codec.name], priority, key))
+        await self._gather_sends(sends)
 
-    async def broadcast_bytes(self, data: bytes):
-        if not self.clients:
+    async def broadcast_bytes(self, data: bytes, priority: Priority = Priority.BULK):
+        if not self._outboxes:
             return
-        await asyncio.gather(*[ws.send(data) for ws in self.clients])
+        sends = [
+            outbox.send(outbox.codec.wrap_stream(data), priority, command=False)
+            for outbox in list(self._outboxes.values())
+        ]
+        await self._gather_sends(sends)
+
+    async def _gather_sends(self, sends: list):
+        if len(sends) == 1:
+            # No task per send: consecutive keyed sends then queue in the same tick.
+            await sends[0]
+            return
+        await asyncio.gather(*sends)
+
+    def _priority_for(self, data: dict, priority: Optional[Priority]) -> Priority:
+        if priority is not None:
+            return priority
+        return MESSAGE_PRIORITIES.get(data.get("type"), Priority.CONTROL)
+
+    def supports(self, capability: str) -> bool:
+        """Whether any connected client announced `capability` in its hello."""
+        return any(capability in outbox.capabilities for outbox in self._outboxes.values())
+
+    def stats(self) -> list[dict]:
+        return [outbox.stats() for outbox in self._outboxes.values()]
+
+    def totals(self) -> dict[str, int]:
+        """Outbound counters summed over current and past clients."""
+        totals = dict(self._closed_totals)
+        for outbox in self._outboxes.values():
+            for name in OUTBOX_COUNTERS:
+                totals[name] += getattr(outbox, name)
+        return totals
 
     async def broadcast(self, data: dict):
         # Backward-compatible alias used across the existing codebase.
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True, slots=True)
+class FirmwareImage:
+    path: Path
+    size: int
+    mtime_ns: int
+    md5: str
+    sha1: str
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def key(self) -> str:
+        # Content-addressed: a rebuilt image gets a new URL.
+        return self.sha1
+
+
+class FirmwareStore:
+    """
+    Registry of firmware images the device may download for OTA.
+
+    Digests are computed in a single pass and cached per (path, mtime_ns,
+    size), so re-sending an unchanged image does not re-read it. Registering
+    reads the file and should run in a worker thread.
+    """
+
+    def __init__(self):
+        self._digests: dict[tuple[str, int, int], tuple[str, str]] = {}
+        self._images: dict[str, FirmwareImage] = {}
+        self._lock = threading.Lock()
+
+    def register(self, path: str | Path) -> FirmwareImage:
+        path = Path(path).resolve()
+        if not path.is_file():
+            raise FileNotFoundError(f"Firmware file not found: {path}")
+
+        stat = path.stat()
+        ident = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digests = self._digests.get(ident)
+
+        if digests is None:
+            md5 = hashlib.md5()
+            sha1 = hashlib.sha1()
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(65536)
+                    if not chunk:
+                        break
+                    md5.update(chunk)
+                    sha1.update(chunk)
+            digests = (md5.hexdigest(), sha1.hexdigest())
+
+        image = FirmwareImage(
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            md5=digests[0],
+            sha1=digests[1],
+        )
+        with self._lock:
+            self._digests[ident] = digests
+            self._images[image.key] = image
+        return image
+
+    def lookup(self, key: str) -> FirmwareImage | None:
+        """Return the registered image for `key` if its file is still unchanged."""
+        with self._lock:
+            image = self._images.get(key)
+        if image is None:
+            return None
+
+        try:
+            stat = image.path.stat()
+        except OSError:
+            stat = None
+        if stat is None or stat.st_mtime_ns != image.mtime_ns or stat.st_size != image.size:
+            with self._lock:
+                self._images.pop(key, None)
+            return None
+        return image
+
+    def stats(self) -> dict:
+        with self._lock:
+            images = list(self._images.values())
+        return {
+            "images": [{"name": image.name, "size": image.size, "sha1": image.sha1} for image in images],
+        }
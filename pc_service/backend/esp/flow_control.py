@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from collections import deque
+
+
+class AckWindow:
+    """
+    Sliding-window pacing for binary transfers acknowledged by byte offset.
+
+    The device reports the cumulative number of bytes it has stored. Up to
+    `window` chunks may be unacknowledged at once. Round-trip times are
+    smoothed like TCP's SRTT/RTTVAR. The queueing delay is the smoothed RTT
+    minus the best RTT seen, and the window is steered to keep it near
+    `target_delay` (LEDBAT-style). The window grows while the delay is under
+    target. Once half of `max_window` is reached, chunks double in size so
+    the device handles fewer, larger frames. Above target the window shrinks.
+    Keeping the queue short keeps control messages from waiting behind bulk
+    data.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_chunk: int = 1024,
+        min_chunk: int = 512,
+        max_chunk: int = 4096,
+        initial_window: int = 4,
+        min_window: int = 1,
+        max_window: int = 32,
+        target_delay: float = 0.05,
+    ):
+        self.min_chunk = max(1, int(min_chunk))
+        self.max_chunk = max(self.min_chunk, int(max_chunk))
+        self.min_window = max(1, int(min_window))
+        self.max_window = max(self.min_window, int(max_window))
+        self.chunk_size = max(self.min_chunk, min(self.max_chunk, int(initial_chunk)))
+        self.window = max(self.min_window, min(self.max_window, int(initial_window)))
+        self.target_delay = max(0.001, float(target_delay))
+
+        self.acked = 0
+        self.acks = 0
+        self.timeouts = 0
+        self.srtt: float | None = None
+        self.rttvar = 0.0
+        self.min_rtt: float | None = None
+        # (end offset, send time) for every chunk still in flight.
+        self._inflight: deque[tuple[int, float]] = deque()
+
+    @property
+    def window_bytes(self) -> int:
+        return self.window * self.chunk_size
+
+    @property
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return 2.0
+        return max(0.25, min(5.0, self.srtt + 4 * self.rttvar))
+
+    def restart(self, offset: int):
+        """Forget in-flight chunks and continue from `offset`, keeping RTT estimates."""
+        self.acked = max(0, int(offset))
+        self.acks = 0
+        self._inflight.clear()
+
+    def can_send(self, sent: int) -> bool:
+        return sent - self.acked < self.window_bytes
+
+    def on_send(self, end_offset: int, now: float):
+        self._inflight.append((int(end_offset), now))
+
+    def on_ack(self, offset: int, now: float) -> bool:
+        offset = int(offset)
+        self.acks += 1
+        if offset <= self.acked:
+            return False
+
+        self.acked = offset
+        sample = None
+        while self._inflight and self._inflight[0][0] <= offset:
+            _end, sent_at = self._inflight.popleft()
+            sample = now - sent_at
+
+        if sample is not None:
+            self._update_rtt(max(0.0, sample))
+            self._tune()
+        return True
+
+    def on_timeout(self):
+        self.timeouts += 1
+        self.window = max(self.min_window, self.window // 2)
+        self.chunk_size = max(self.min_chunk, self.chunk_size // 2)
+
+    def _update_rtt(self, sample: float):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.min_rtt = sample if self.min_rtt is None else min(self.min_rtt, sample)
+
+    def _tune(self):
+        queue_delay = self.srtt - self.min_rtt
+        if queue_delay < self.target_delay:
+            if self.window < self.max_window:
+                self.window += 1
+            if self.window >= self.max_window // 2 and self.chunk_size < self.max_chunk:
+                self.chunk_size = min(self.max_chunk, self.chunk_size * 2)
+                self.window = max(self.min_window, self.window // 2)
+        elif queue_delay > 2 * self.target_delay:
+            self.window = max(self.min_window, self.window - 1)
+
+    def stats(self) -> dict:
+        return {
+            "acked": self.acked,
+            "chunk_size": self.chunk_size,
+            "window": self.window,
+            "srtt_ms": round(self.srtt * 1000, 1) if self.srtt is not None else None,
+            "timeouts": self.timeouts,
+        }
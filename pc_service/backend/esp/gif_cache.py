@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator
+
+from .gif_codec import GifFrameStream
+
+
+class GifConversionCache:
+    """
+    Size-bounded on-disk LRU cache of converted GIF binaries.
+
+    Entries are addressed by the SHA-256 of the source file plus every
+    parameter that changes the encoded bytes, so resending the same animation
+    with the same frame mask and dimensions skips decoding entirely. Entries
+    are written and read frame by frame, never held in memory as a whole.
+    Each entry is stored as `<key>.bin` (RGB565 data) and `<key>.json` (metadata).
+    Only the access time of a `.bin` file is touched on use; its mtime stays
+    fixed so HTTP validators derived from it remain stable.
+    """
+
+    def __init__(self, root: str | Path, *, max_bytes: int = 64 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> size of the .bin file, least recently used first.
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        # (path, mtime_ns, size) -> sha256 of the file contents.
+        self._source_hashes: dict[tuple[str, int, int], str] = {}
+        self._total_bytes = 0
+        # Streams are consumed from worker threads, so index updates are locked.
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        if not self.root.is_dir():
+            return
+
+        found = []
+        for meta_path in self.root.glob("*.json"):
+            bin_path = meta_path.with_suffix(".bin")
+            try:
+                stat = bin_path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_atime, meta_path.stem, stat.st_size))
+
+        for _atime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def source_hash(self, source: str | Path) -> str:
+        source = Path(source)
+        stat = source.stat()
+        ident = (str(source.resolve()), stat.st_mtime_ns, stat.st_size)
+        cached = self._source_hashes.get(ident)
+        if cached is not None:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                digest.update(chunk)
+
+        value = digest.hexdigest()
+        self._source_hashes[ident] = value
+        return value
+
+    def make_key(self, source: str | Path, params: dict[str, Any]) -> str:
+        normalized = {
+            "width": int(params.get("width", 80)),
+            "height": int(params.get("height", 80)),
+            "remove_frames": sorted({int(i) for i in (params.get("remove_frames") or []) if int(i) > 0}),
+            "contrast": float(params.get("contrast", 1.45)),
+            "brightness": float(params.get("brightness", 1.20)),
+            "bg_color": [int(c) for c in params.get("bg_color", (0, 0, 0, 255))],
+        }
+        material = self.source_hash(source) + json.dumps(normalized, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def open_stream(self, key: str, *, name: str, delay_ms: int, offset: int = 0) -> GifFrameStream | None:
+        """
+        Return a stream that reads a cached binary from disk one frame at a
+        time, starting `offset` bytes in (used to resume interrupted transfers).
+        """
+        with self._lock:
+            known = key in self._entries
+        if not known:
+            self.misses += 1
+            return None
+
+        bin_path = self.root / f"{key}.bin"
+        try:
+            with open(self.root / f"{key}.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            size = bin_path.stat().st_size
+        except (OSError, ValueError):
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        if size != int(meta.get("total_size", -1)):
+            self._drop(key)
+            self.misses += 1
+            return None
+
+        self._touch(key, bin_path)
+        self.hits += 1
+
+        width = int(meta["width"])
+        height = int(meta["height"])
+        return GifFrameStream(
+            name=name,
+            width=width,
+            height=height,
+            frames=int(meta["frames"]),
+            delay_ms=int(delay_ms),
+            total_size=size,
+            chunks=self._read_chunks(bin_path, width * height * 2, offset),
+        )
+
+    def entry_path(self, key: str) -> Path | None:
+        """Return the committed `.bin` file for `key`, or None if it is not cached."""
+        with self._lock:
+            known = key in self._entries
+        bin_path = self.root / f"{key}.bin"
+        if not known or not bin_path.is_file():
+            return None
+        self._touch(key, bin_path)
+        return bin_path
+
+    def content_md5(self, key: str) -> str | None:
+        """MD5 of the cached binary itself, which the firmware can verify with MD5Builder."""
+        meta_path = self.root / f"{key}.json"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        digest = meta.get("md5")
+        if isinstance(digest, str) and digest:
+            return digest
+
+        # Entries written before digests were recorded.
+        bin_path = self.entry_path(key)
+        if bin_path is None:
+            return None
+        checksum = hashlib.md5()
+        try:
+            for chunk in self._read_chunks(bin_path, 65536):
+                checksum.update(chunk)
+            meta["md5"] = checksum.hexdigest()
+            self._write_meta(meta_path, meta)
+        except OSError:
+            return None
+        return meta["md5"]
+
+    def _touch(self, key: str, bin_path: Path):
+        try:
+            os.utime(bin_path, ns=(time.time_ns(), bin_path.stat().st_mtime_ns))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _read_chunks(self, path: Path, chunk_size: int, offset: int = 0) -> Iterator[bytes]:
+        with open(path, "rb") as f:
+            f.seek(max(0, int(offset)))
+            while True:
+                chunk = f.read(max(1, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+
+    def record(self, key: str, stream: GifFrameStream) -> GifFrameStream:
+        """
+        Wrap a freshly converted stream so its frames are written to the cache
+        as they are consumed. The entry is committed only if the stream is
+        read to the end; an interrupted transfer leaves nothing behind.
+        """
+        if stream.total_size > self.max_bytes:
+            return stream
+
+        return GifFrameStream(
+            name=stream.name,
+            width=stream.width,
+            height=stream.height,
+            frames=stream.frames,
+            delay_ms=stream.delay_ms,
+            total_size=stream.total_size,
+            chunks=self._tee_chunks(key, stream),
+        )
+
+    def _tee_chunks(self, key: str, stream: GifFrameStream) -> Iterator[bytes]:
+        tmp_bin = self.root / f"{key}.bin.tmp"
+        written = 0
+        checksum = hashlib.md5()
+        committed = False
+        f = None
+
+        try:
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                f = open(tmp_bin, "wb")
+            except OSError as e:
+                print("GIF cache write failed:", e)
+
+            for chunk in stream.chunks:
+                if f is not None:
+                    try:
+                        f.write(chunk)
+                        checksum.update(chunk)
+                        written += len(chunk)
+                    except OSError as e:
+                        # Caching is best effort: keep streaming to the device.
+                        print("GIF cache write failed:", e)
+                        f.close()
+                        f = None
+                yield chunk
+
+            if f is not None:
+                f.close()
+                f = None
+                if written == stream.total_size:
+                    try:
+                        self._commit(key, stream, tmp_bin, checksum.hexdigest())
+                        committed = True
+                    except OSError as e:
+                        print("GIF cache write failed:", e)
+        finally:
+            if f is not None:
+                f.close()
+            if not committed:
+                try:
+                    tmp_bin.unlink()
+                except OSError:
+                    pass
+
+    def _commit(self, key: str, stream: GifFrameStream, tmp_bin: Path, md5: str):
+        bin_path = self.root / f"{key}.bin"
+        meta_path = self.root / f"{key}.json"
+        meta = {
+            "width": stream.width,
+            "height": stream.height,
+            "frames": stream.frames,
+            "total_size": stream.total_size,
+            "md5": md5,
+        }
+
+        os.replace(tmp_bin, bin_path)
+        self._write_meta(meta_path, meta)
+
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = stream.total_size
+            self._total_bytes += stream.total_size
+        self._evict()
+
+    def _write_meta(self, meta_path: Path, meta: dict):
+        tmp_meta = meta_path.with_suffix(".json.tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        for suffix in (".bin", ".json"):
+            try:
+                (self.root / f"{key}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print("GIF cache cleanup failed:", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+            total_bytes = self._total_bytes
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
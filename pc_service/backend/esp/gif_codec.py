@@ -1,20 +1,22 @@
 from __future__ import annotations
 
-import struct
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 
 @dataclass(slots=True)
-class GifBinaryPayload:
+class GifHeader:
     name: str
     width: int
     height: int
     frames: int
     delay_ms: int
     total_size: int
-    data: bytes
+
+    @property
+    def frame_size(self) -> int:
+        return self.width * self.height * 2
 
     def metadata(self) -> dict:
         return {
@@ -28,7 +30,90 @@ class GifBinaryPayload:
         }
 
 
-def build_rgb565_from_gif(
+@dataclass(slots=True)
+class GifBinaryPayload(GifHeader):
+    data: bytes
+
+
+@dataclass(slots=True)
+class GifFrameStream(GifHeader):
+    """
+    Lazily encoded animation: `chunks` yields RGB565 bytes one frame at a time.
+
+    The header (including `total_size`) is known before the first frame is
+    decoded, so `set_gif` metadata can go out immediately.
+    """
+
+    chunks: Iterator[bytes]
+
+    def skip(self, offset: int) -> GifFrameStream:
+        """Return a stream over the same animation starting `offset` bytes in."""
+        return GifFrameStream(
+            name=self.name,
+            width=self.width,
+            height=self.height,
+            frames=self.frames,
+            delay_ms=self.delay_ms,
+            total_size=self.total_size,
+            chunks=_skip_bytes(self.chunks, offset),
+        )
+
+    def read_all(self) -> GifBinaryPayload:
+        data = b"".join(self.chunks)
+        return GifBinaryPayload(
+            name=self.name,
+            width=self.width,
+            height=self.height,
+            frames=self.frames,
+            delay_ms=self.delay_ms,
+            total_size=len(data),
+            data=data,
+        )
+
+
+def _skip_bytes(chunks: Iterator[bytes], offset: int) -> Iterator[bytes]:
+    remaining = max(0, int(offset))
+    try:
+        for chunk in chunks:
+            if remaining >= len(chunk):
+                remaining -= len(chunk)
+                continue
+            yield chunk[remaining:] if remaining else chunk
+            remaining = 0
+    finally:
+        chunks.close()
+
+
+# Lookup tables for the two bytes of a little-endian RGB565 pixel.
+# Low byte:  GGGBBBBB (lower 3 bits of green, 5 bits of blue).
+# High byte: RRRRRGGG (5 bits of red, upper 3 bits of green).
+# Every table occupies its own bit range, so adding two of them never carries.
+_LO_GREEN = [(g & 0x1C) << 3 for g in range(256)]
+_LO_BLUE = [b >> 3 for b in range(256)]
+_HI_RED = [r & 0xF8 for r in range(256)]
+_HI_GREEN = [g >> 5 for g in range(256)]
+
+
+def encode_rgb565_frame(frame) -> bytes:
+    """
+    Encode an RGB Pillow image into raw little-endian RGB565 bytes.
+
+    Works on whole channel planes instead of individual pixels: each output
+    byte is built with `point()` lookups and `ImageChops.add`, then the two
+    byte planes are interleaved by Pillow's raw encoder.
+    """
+    from PIL import Image, ImageChops
+
+    if frame.mode != "RGB":
+        frame = frame.convert("RGB")
+
+    red, green, blue = frame.split()
+    lo = ImageChops.add(green.point(_LO_GREEN), blue.point(_LO_BLUE))
+    hi = ImageChops.add(red.point(_HI_RED), green.point(_HI_GREEN))
+    return Image.merge("LA", (lo, hi)).tobytes()
+
+
+def open_rgb565_stream(
     gif_path: str | Path,
     *,
     name: str | None = None,
@@ -39,32 +124,64 @@ def build_rgb565_from_gif(
     bg_color: tuple[int, int, int, int] = (0, 0, 0, 255),
     contrast: float = 1.45,
     brightness: float = 1.20,
-) -> GifBinaryPayload:
+) -> GifFrameStream:
     """
-    Convert a GIF into a raw RGB565 animation binary (little-endian).
+    Prepare a streaming GIF -> RGB565 conversion.
 
-    `remove_frames` uses 1-based indices to match the UI payload.
+    Only the frame count is read up front; pixel data is decoded and encoded
+    frame by frame as `chunks` is consumed. `remove_frames` uses 1-based
+    indices to match the UI payload.
     """
     gif_path = Path(gif_path)
     if not gif_path.exists():
         raise FileNotFoundError(f"GIF file not found: {gif_path}")
 
     try:
-        from PIL import Image, ImageEnhance, ImageOps
+        from PIL import Image
     except ImportError as e:
         raise RuntimeError("Pillow is required for GIF processing") from e
 
     remove_set = {int(i) for i in (remove_frames or []) if int(i) > 0}
-    raw = bytearray()
-    frame_count = 0
-
     with Image.open(gif_path) as img:
         total_frames = getattr(img, "n_frames", 1)
-        for frame_index in range(total_frames):
-            frame_num = frame_index + 1
-            if frame_num in remove_set:
-                continue
 
+    kept = [index for index in range(total_frames) if index + 1 not in remove_set]
+    if not kept:
+        raise ValueError("All GIF frames were removed; nothing to send")
+
+    return GifFrameStream(
+        name=name or gif_path.name,
+        width=width,
+        height=height,
+        frames=len(kept),
+        delay_ms=delay_ms,
+        total_size=len(kept) * width * height * 2,
+        chunks=_iter_rgb565_frames(
+            gif_path,
+            kept,
+            width=width,
+            height=height,
+            bg_color=bg_color,
+            contrast=contrast,
+            brightness=brightness,
+        ),
+    )
+
+
+def _iter_rgb565_frames(
+    gif_path: Path,
+    frame_indices: list[int],
+    *,
+    width: int,
+    height: int,
+    bg_color: tuple[int, int, int, int],
+    contrast: float,
+    brightness: float,
+) -> Iterator[bytes]:
+    from PIL import Image, ImageEnhance, ImageOps
+
+    with Image.open(gif_path) as img:
+        for frame_index in frame_indices:
             img.seek(frame_index)
             frame = img.convert("RGBA")
             background = Image.new("RGBA", frame.size, bg_color)
@@ -77,23 +194,35 @@ def build_rgb565_from_gif(
 
             frame = ImageOps.fit(frame, (width, height), Image.Resampling.LANCZOS)
 
-            for r, g, b in frame.getdata():
-                rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
-                raw.extend(struct.pack("<H", rgb565))
+            yield encode_rgb565_frame(frame)
 
-            frame_count += 1
 
-    if frame_count == 0:
-        raise ValueError("All GIF frames were removed; nothing to send")
+def build_rgb565_from_gif(
+    gif_path: str | Path,
+    *,
+    name: str | None = None,
+    width: int = 80,
+    height: int = 80,
+    delay_ms: int = 200,
+    remove_frames: Iterable[int] | None = None,
+    bg_color: tuple[int, int, int, int] = (0, 0, 0, 255),
+    contrast: float = 1.45,
+    brightness: float = 1.20,
+) -> GifBinaryPayload:
+    """
+    Convert a GIF into a raw RGB565 animation binary (little-endian).
 
-    binary = bytes(raw)
-    return GifBinaryPayload(
-        name=name or gif_path.name,
+    `remove_frames` uses 1-based indices to match the UI payload.
+    """
+    stream = open_rgb565_stream(
+        gif_path,
+        name=name,
         width=width,
         height=height,
-        frames=frame_count,
         delay_ms=delay_ms,
-        total_size=len(binary),
-        data=binary,
+        remove_frames=remove_frames,
+        bg_color=bg_color,
+        contrast=contrast,
+        brightness=brightness,
     )
-
+    return stream.read_all()
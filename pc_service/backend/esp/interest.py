@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Optional
+
+
+# Screens that show a topic; None means any screen while the display is on.
+# Colors use the screen name of `set_color` ("screen3") as their topic.
+TOPIC_SCREENS: dict[str, Optional[frozenset[int]]] = {
+    "music": None,
+    "volume": None,
+    "pc_load": frozenset({4}),
+    "schedule": frozenset({3}),
+}
+# Volume only pops an overlay, so a stale value is dropped instead of replayed.
+TRANSIENT_TOPICS = frozenset({"volume"})
+
+
+def topic_screens(topic: str) -> Optional[frozenset[int]]:
+    if topic in TOPIC_SCREENS:
+        return TOPIC_SCREENS[topic]
+    if topic.startswith("screen") and topic[6:].isdigit():
+        return frozenset({int(topic[6:])})
+    return None
+
+
+class ScreenInterest:
+    """
+    What the device can show right now, as declared by the firmware:
+    {"type": "interest", "screen": 4, "sleeping": false}
+
+    A message for a topic nobody can see is held back; only the newest one
+    per key is kept and it is backfilled once its screen becomes visible.
+    Firmware that advertises the "interest" capability gets nothing gated
+    until its first declaration arrives; firmware without it gets every
+    message, as before. With several devices the last declaration wins.
+    """
+
+    def __init__(self):
+        self.declared = False
+        self.expected = False
+        self.screen: Optional[int] = None
+        self.sleeping = False
+        self._held: dict[str, tuple[str, dict]] = {}
+        self.updates = 0
+        self.held_total = 0
+        self.dropped = 0
+        self.backfilled = 0
+
+    def reset(self, *, expected: bool):
+        """Forget the previous device's state; `expected` if a declaration will follow."""
+        self.declared = False
+        self.expected = expected
+        self.screen = None
+        self.sleeping = False
+        self._held.clear()
+
+    def update(self, data: dict) -> bool:
+        """Apply an `interest` message; return whether anything changed."""
+        try:
+            screen = int(data.get("screen"))
+        except (TypeError, ValueError):
+            screen = self.screen
+        sleeping = bool(data.get("sleeping", False))
+
+        changed = not self.declared or screen != self.screen or sleeping != self.sleeping
+        self.declared = True
+        self.screen = screen
+        self.sleeping = sleeping
+        if changed:
+            self.updates += 1
+        return changed
+
+    def wants(self, topic: str) -> bool:
+        if not self.declared:
+            return not self.expected
+        if self.sleeping:
+            return False
+        screens = topic_screens(topic)
+        return screens is None or self.screen in screens
+
+    def hold(self, topic: str, message: dict, key: Optional[str] = None):
+        if topic in TRANSIENT_TOPICS:
+            self.dropped += 1
+            return
+        key = key or topic
+        # Re-insert so backfill keeps the order of the latest updates.
+        self._held.pop(key, None)
+        self._held[key] = (topic, message)
+        self.held_total += 1
+
+    def take_visible(self) -> list[dict]:
+        """Remove and return the held messages the device can show now."""
+        ready = [key for key, (topic, _message) in self._held.items() if self.wants(topic)]
+        messages = [self._held.pop(key)[1] for key in ready]
+        self.backfilled += len(messages)
+        return messages
+
+    def stats(self) -> dict:
+        return {
+            "declared": self.declared,
+            "screen": self.screen,
+            "sleeping": self.sleeping,
+            "held": len(self._held),
+            "updates": self.updates,
+            "held_total": self.held_total,
+            "dropped": self.dropped,
+            "backfilled": self.backfilled,
+        }
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+
+from .codec import JSON_CODEC, MSGPACK_CODEC, JsonCodec, MsgpackCodec
+
+
+class Priority(IntEnum):
+    CONTROL = 0
+    INTERACTIVE = 1
+    TELEMETRY = 2
+    BULK = 3
+
+
+# Overlays the device shows immediately, and periodic samples that are
+# superseded by the next one. Everything else is sent as CONTROL.
+MESSAGE_PRIORITIES = {
+    "volume": Priority.INTERACTIVE,
+    "music": Priority.INTERACTIVE,
+    "set_color": Priority.INTERACTIVE,
+    "pc_load": Priority.TELEMETRY,
+}
+
+# When full, these classes drop their oldest message instead of waiting.
+LOSSY_PRIORITIES = frozenset({Priority.INTERACTIVE, Priority.TELEMETRY})
+
+# Limits for one `batch` frame (items, and characters or bytes). The firmware
+# sizes its parse document from the frame length, so frames stay small.
+BATCH_MAX_ITEMS = 16
+BATCH_MAX_LEN = 1536
+
+# Cumulative per-client counters, summed by ESPConnection.totals().
+OUTBOX_COUNTERS = ("sent", "frames", "batched", "sent_bytes", "dropped", "coalesced")
+
+# State the device only needs the latest value of.
+COALESCED_TYPES = frozenset({"volume", "music", "pc_load"})
+
+
+def coalesce_key(data: dict) -> tuple | None:
+    """Key under which a newer message supersedes a queued older one, if any."""
+    msg_type = data.get("type")
+    if msg_type in COALESCED_TYPES:
+        return (msg_type,)
+    if msg_type == "set_color":
+        return (msg_type, data.get("screen"), data.get("element"))
+    return None
+
+
+@dataclass(slots=True)
+class _Outgoing:
+    message: str | bytes
+    # None for coalesced messages, whose senders do not wait for delivery.
+    future: asyncio.Future | None
+    queued_at: float
+    key: tuple | None = None
+    # False for raw stream data, which is never batched.
+    command: bool = True
+
+
+class _WaitStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {"avg_ms": round(avg * 1000, 2), "max_ms": round(self.max * 1000, 2)}
+
+
+class ClientOutbox:
+    """
+    Outbound queue and sender task for one WebSocket client.
+
+    Messages wait in one bounded queue per priority class and a single task
+    sends them highest class first, so an overlay update goes out between two
+    GIF chunks instead of after the whole animation. Control and bulk senders
+    wait for room when their queue is full. Interactive and telemetry queues
+    drop their oldest message instead, since only the latest value matters.
+    `send()` returns once the message has been written (True) or dropped
+    (False), and raises the socket's error if the connection failed.
+
+    Messages sent with a coalescing key return as soon as they are queued.
+    If a message with the same key is still waiting, the new one takes its
+    place in the queue, so a burst of volume changes becomes one frame.
+
+    Once the client announces the `batch` capability, commands that are
+    queued together (typically issued within one event-loop tick) are sent
+    as a single `{"type": "batch", "items": [...]}` frame.
+
+    Messages arrive already encoded with `codec`; the connection switches it
+    when MessagePack is negotiated.
+    """
+
+    def __init__(self, ws, *, max_depth: int = 64, max_bulk_depth: int = 8):
+        self.ws = ws
+        self._queues: dict[Priority, deque[_Outgoing]] = {p: deque() for p in Priority}
+        self._limits = {p: max(1, int(max_depth)) for p in Priority}
+        self._limits[Priority.BULK] = max(1, int(max_bulk_depth))
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._error: BaseException | None = None
+        self._sending: list[_Outgoing] = []
+        self._keyed: dict[tuple, _Outgoing] = {}
+        self.capabilities: frozenset[str] = frozenset()
+        self.codec: JsonCodec | MsgpackCodec = JSON_CODEC
+
+        self.sent = 0
+        self.frames = 0
+        self.batched = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._waits = {p: _WaitStats() for p in Priority}
+        self._task = asyncio.create_task(self._run())
+
+    async def send(
+        self,
+        message: str | bytes,
+        priority: Priority,
+        key: tuple | None = None,
+        *,
+        command: bool = True,
+    ) -> bool:
+        if self._error is not None:
+            raise self._error
+
+        if key is not None:
+            queued = self._keyed.get(key)
+            if queued is not None:
+                queued.message = message
+                self.coalesced += 1
+                return True
+
+        queue = self._queues[priority]
+        while len(queue) >= self._limits[priority] and self._error is None:
+            if priority in LOSSY_PRIORITIES:
+                self._settle(queue.popleft(), False)
+                self.dropped += 1
+                break
+            self._space.clear()
+            await self._space.wait()
+
+        if self._error is not None:
+            raise self._error
+
+        loop = asyncio.get_running_loop()
+        if key is not None:
+            item = _Outgoing(message, None, loop.time(), key)
+            self._keyed[key] = item
+            queue.append(item)
+            self._ready.set()
+            return True
+
+        future = loop.create_future()
+        queue.append(_Outgoing(message, future, loop.time(), command=command))
+        self._ready.set()
+        return await future
+
+    def _next(self) -> tuple[Priority, _Outgoing] | None:
+        for priority, queue in self._queues.items():
+            if queue:
+                item = queue.popleft()
+                if item.key is not None:
+                    self._keyed.pop(item.key, None)
+                return priority, item
+        return None
+
+    def _settle(self, item: _Outgoing, result: bool):
+        if item.key is not None and self._keyed.get(item.key) is item:
+            del self._keyed[item.key]
+        if item.future is not None and not item.future.done():
+            item.future.set_result(result)
+
+    @property
+    def batching(self) -> bool:
+        return "batch" in self.capabilities
+
+    def _take(self) -> list[tuple[Priority, _Outgoing]]:
+        """Pop the next message plus, for batching clients, the JSON queued behind it."""
+        first = self._next()
+        if first is None:
+            return []
+        priority, item = first
+        if not self.batching or priority == Priority.BULK or not item.command:
+            return [first]
+
+        # Never mix encodings, e.g. around the switch to MessagePack.
+        kind = type(item.message)
+        items = [first]
+        size = len(item.message)
+        for priority in (Priority.CONTROL, Priority.INTERACTIVE, Priority.TELEMETRY):
+            queue = self._queues[priority]
+            while queue and len(items) < BATCH_MAX_ITEMS:
+                item = queue[0]
+                if (
+                    not item.command
+                    or type(item.message) is not kind
+                    or size + len(item.message) + 1 > BATCH_MAX_LEN
+                ):
+                    break
+                queue.popleft()
+                if item.key is not None:
+                    self._keyed.pop(item.key, None)
+                items.append((priority, item))
+                size += len(item.message) + 1
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if not any(self._queues.values()):
+                    self._ready.clear()
+                    await self._ready.wait()
+                    if self.batching:
+                        # Let commands issued in the same tick join this frame.
+                        await asyncio.sleep(0)
+                    continue
+
+                entries = self._take()
+                now = loop.time()
+                for priority, item in entries:
+                    self._waits[priority].add(now - item.queued_at)
+                self._space.set()
+
+                self._sending = [item for _priority, item in entries]
+                if len(entries) == 1:
+                    message = entries[0][1].message
+                else:
+                    codec = JSON_CODEC if isinstance(entries[0][1].message, str) else MSGPACK_CODEC
+                    message = codec.batch([item.message for item in self._sending])
+                try:
+                    await self.ws.send(message)
+                except Exception as e:
+                    self._fail(e)
+                    return
+
+                self.frames += 1
+                self.sent += len(entries)
+                if len(entries) > 1:
+                    self.batched += len(entries)
+                if isinstance(message, str):
+                    self.sent_bytes += len(message.encode("utf-8"))
+                else:
+                    self.sent_bytes += len(message)
+                sent, self._sending = self._sending, []
+                for item in sent:
+                    self._settle(item, True)
+        except asyncio.CancelledError:
+            self._fail(ConnectionError("ESP client disconnected"))
+            raise
+
+    def _fail(self, error: BaseException):
+        self._error = error
+        pending, self._sending = self._sending, []
+        for queue in self._queues.values():
+            pending.extend(queue)
+            queue.clear()
+        self._keyed.clear()
+        for item in pending:
+            if item.future is not None and not item.future.done():
+                item.future.set_exception(error)
+        self._space.set()
+
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        remote = getattr(self.ws, "remote_address", None)
+        return {
+            "client": f"{remote[0]}:{remote[1]}" if remote else None,
+            "depth": {p.name.lower(): len(q) for p, q in self._queues.items()},
+            "wait": {p.name.lower(): w.as_dict() for p, w in self._waits.items()},
+            "capabilities": sorted(self.capabilities),
+            "codec": self.codec.name,
+            "sent": self.sent,
+            "frames": self.frames,
+            "batched": self.batched,
+            "sent_bytes": self.sent_bytes,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from ..core.telemetry import TelemetrySample
+
+
+PC_LOAD_METRICS = ("cpu", "gpu", "ram")
+
+
+class PcLoadPolicy:
+    """
+    Decides which telemetry samples are worth a `pc_load` frame.
+
+    A sample is sent when any metric moved more than its deadband (in
+    percentage points) since the last frame sent, or when nothing was sent
+    for `heartbeat_sec`. The device only shows whole percents, so changes
+    inside the deadband are invisible anyway.
+
+    The sampling interval adapts: every quiet sample stretches it by
+    `backoff` up to `max_interval`, and a sample that crosses a deadband
+    resets it to `min_interval`, so bursts of activity are followed closely
+    and an idle PC costs a frame per heartbeat.
+    """
+
+    def __init__(
+        self,
+        *,
+        deadbands: Optional[dict[str, float]] = None,
+        heartbeat_sec: float = 5.0,
+        min_interval: float = 0.5,
+        max_interval: float = 2.0,
+        backoff: float = 1.5,
+    ):
+        self.deadbands = {"cpu": 2.0, "gpu": 2.0, "ram": 1.0}
+        if deadbands:
+            self.deadbands.update({k: max(0.0, float(v)) for k, v in deadbands.items() if k in PC_LOAD_METRICS})
+        self.heartbeat_sec = max(0.5, float(heartbeat_sec))
+        self.min_interval = max(0.1, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self.backoff = max(1.0, float(backoff))
+
+        self.interval = self.min_interval
+        self._last_sent: Optional[TelemetrySample] = None
+        self.sent = 0
+        self.heartbeats = 0
+        self.suppressed = 0
+
+    def reset(self):
+        """Forget the last frame, so the next sample is always sent."""
+        self._last_sent = None
+        self.interval = self.min_interval
+
+    def should_send(self, sample: TelemetrySample) -> bool:
+        last = self._last_sent
+        if last is None:
+            changed = True
+        else:
+            changed = any(
+                abs(getattr(sample, metric) - getattr(last, metric)) > self.deadbands[metric]
+                for metric in PC_LOAD_METRICS
+            )
+
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+        if changed:
+            self.sent += 1
+        elif sample.taken_at - last.taken_at >= self.heartbeat_sec:
+            self.sent += 1
+            self.heartbeats += 1
+        else:
+            self.suppressed += 1
+            return False
+
+        self._last_sent = sample
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "deadbands": dict(self.deadbands),
+            "heartbeat_sec": self.heartbeat_sec,
+            "interval_sec": round(self.interval, 3),
+            "sent": self.sent,
+            "heartbeats": self.heartbeats,
+            "suppressed": self.suppressed,
+        }
@@ -1,69 +1,69 @@
 import asyncio
-import hashlib
 import json
 import re
-from copy import deepcopy
+import uuid
+from contextlib import aclosing
+from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
 from typing import Awaitable, Callable, Optional
 
-import psutil
+from websockets.exceptions import ConnectionClosed
 
 from .connection import ESPConnection
-from .gif_codec import build_rgb565_from_gif
+from .firmware_store import FirmwareImage, FirmwareStore
+from .flow_control import AckWindow
+from .gif_cache import GifConversionCache
+from .gif_codec import GifFrameStream, open_rgb565_stream
+from .interest import ScreenInterest
+from .pc_load import PcLoadPolicy
 from ..core.alive_services import AppContext
-from ..core.gpu import get_gpu_load_percent
+from ..core.telemetry import TelemetrySample, TelemetrySubscription, get_telemetry_sampler
 from ..core.paths import data_path
+from ..core.settings import get_settings_store
 
 
-DEFAULT_STORED_SETTINGS = {
-    "wifi": {"ssid": "", "password": ""},
-    "weather": {
-        "api_key": "",
-        "latitude": "55.7558",
-        "longitude": "37.6173",
-        "timeout_sec": 1800,
-    },
-    "display": {
-        "brightness": 180,
-        "weather_dependent": False,
-        "off_time": "23:00",
-        "on_time": "07:00",
-        "accent_color": "#FFAA00",
-    },
-    "backlight": {
-        "brightness": 180,
-        "mode": "5",
-        "led_mode": 5,
-        "weather_dependent": False,
-        "color": "#33CCFF",
-    },
-    "schedule": {
-        "start_time": "07:30",
-        "end_time": "19:30",
-        "sources": [
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-            {"url": "", "stop_name": "", "bus_number": ""},
-        ],
-    },
-    "ota": {"url": "", "firmware_path": ""},
-    "network": {"ws_port": 8765, "udp_port": 45678},
-    "ui_colors": {},
-}
 HEX_COLOR_RE = re.compile(r"^#?[0-9A-Fa-f]{6}$")
 
 
+@dataclass
+class GifTransfer:
+    transfer_id: str
+    key: str
+    total_size: int
+    sent: int = 0
+    resumes: int = 0
+    # Bytes the device already had when a transfer was resumed.
+    resumed_bytes: int = 0
+    # Bytes sent more than once because the device lost them.
+    retried_bytes: int = 0
+
+    def details(self) -> dict:
+        return {
+            "transfer_id": self.transfer_id,
+            "resumes": self.resumes,
+            "resumed_bytes": self.resumed_bytes,
+            "retried_bytes": self.retried_bytes,
+        }
+
+
 class ESPService:
-    SETTINGS_PATH = data_path("backend", "storage", "settings.json")
+    GIF_ACK_STALL_SEC = 10.0
+    GIF_RESUME_WAIT_SEC = 60.0
+    GIF_MAX_RESUMES = 5
 
     def __init__(self, bus):
         self.bus = bus
-        ws_port, udp_port = self._load_network_ports()
-        self.conn = ESPConnection(port=ws_port, udp_port=udp_port)
+        self.settings = get_settings_store()
+        network = self.settings.snapshot()["network"]
+        self.conn = ESPConnection(port=network["ws_port"], udp_port=network["udp_port"])
         self.last_message = None
         self._gif_lock = asyncio.Lock()
+        self._gif_window: Optional[AckWindow] = None
+        self._gif_ack_event = asyncio.Event()
+        self._gif_status_future: Optional[asyncio.Future] = None
+        self._gif_ready_future: Optional[asyncio.Future] = None
+        self._gif_pull_accepted = False
         self._gif_assets_dirs = [
             data_path("backend", "storage", "gifs"),
             data_path("ui", "assets", "gifs"),
@@ -71,74 +71,63 @@ class ESPService:
             data_path("assets", "gifs"),
             data_path("assets"),
         ]
+        self.gif_cache = GifConversionCache(data_path("backend", "storage", "gif_cache"))
+        self.firmware_store = FirmwareStore()
 
         # Параметры мониторинга нагрузки ПК
-        self._pc_load_interval: float = 0.5
-        self._pc_load_task: Optional[asyncio.Task] = None
-        self._pc_load_running: bool = False
-
-    def _load_network_ports(self) -> tuple[int, int]:
-        ws_port = 8765
-        udp_port = 45678
-
-        if not self.SETTINGS_PATH.exists():
-            return ws_port, udp_port
-
-        try:
-            with open(self.SETTINGS_PATH, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-        except Exception:
-            return ws_port, udp_port
-
-        network = settings.get("network", {})
-        try:
-            ws_port = int(network.get("ws_port", ws_port))
-        except (TypeError, ValueError):
-            ws_port = 8765
-        try:
-            udp_port = int(network.get("udp_port", udp_port))
-        except (TypeError, ValueError):
-            udp_port = 45678
+        self.pc_load_policy = PcLoadPolicy(min_interval=0.5)
+        self._pc_load_subscription: Optional[TelemetrySubscription] = None
 
-        ws_port = max(1, min(65535, ws_port))
-        udp_port = max(1, min(65535, udp_port))
-        return ws_port, udp_port
+        # Что сейчас видно на экране устройства
+        self.interest = ScreenInterest()
 
     async def start(self):
         # Передаём обработчик входящих сообщений в соединение
-        await self.conn.start(self.on_message, self._on_connect)
+        await self.conn.start(self.on_message, self._on_connect, self._on_disconnect, self._on_hello)
 
         self.bus.subscribe("volume_changed", self.on_volume)
         self.bus.subscribe("track_changed", self.on_track)
 
+    async def _publish_presence(self):
+        if self.bus is not None:
+            await self.bus.publish("device_presence", {"clients": len(self.conn.clients)})
+
+    async def _on_disconnect(self):
+        if not self.conn.clients:
+            self.interest.reset(expected=False)
+            if self._pc_load_subscription is not None:
+                # Nobody left to look at the monitoring screen.
+                await self._stop_pc_load()
+        await self._publish_presence()
+
     async def _on_connect(self):
-        settings = self._load_saved_settings()
+        # This device's hello is read after the burst; `_on_hello` turns
+        # gating on if it declares its screen.
+        self.interest.reset(expected=self.conn.supports("interest"))
+        await self._publish_presence()
+        settings = self.settings.snapshot()
         await self.send_all_settings(settings)
         await self.send_saved_interface_colors(settings)
+        await self._replay_retained_state()
 
-    def _load_saved_settings(self) -> dict:
-        settings = deepcopy(DEFAULT_STORED_SETTINGS)
-        if not self.SETTINGS_PATH.exists():
-            return settings
-
-        try:
-            with open(self.SETTINGS_PATH, "r", encoding="utf-8") as f:
-                loaded = json.load(f)
-        except Exception:
-            return settings
-
-        if not isinstance(loaded, dict):
-            return settings
+    async def _on_hello(self, capabilities: frozenset[str]):
+        # Firmware with "interest" declares its screen right after hello;
+        # until then screen-bound messages are held and backfilled.
+        if "interest" in capabilities and not self.interest.declared:
+            self.interest.expected = True
 
-        return self._deep_merge(settings, loaded)
+    async def _replay_retained_state(self):
+        """
+        Send the current track the bus retained, without querying Windows.
 
-    def _deep_merge(self, base: dict, patch: dict) -> dict:
-        for key, value in patch.items():
-            if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                base[key] = self._deep_merge(base[key], value)
-            else:
-                base[key] = value
-        return base
+        Volume is not replayed: the firmware treats every `volume` message as
+        a slider move and switches to its overlay screen.
+        """
+        if self.bus is None:
+            return
+        track = self.bus.last("track_changed")
+        if track is not None:
+            await self.on_track(track)
 
     async def on_message(self, raw_msg: str):
         """
@@ -147,27 +136,73 @@ class ESPService:
         Ожидаем, в том числе:
         {"type": "pc_load", "action": "start"}
         {"type": "pc_load", "action": "stop"}
+        {"type": "pc_load", "action": "history", "window": 3600, "points": 60}
         {"type": "schedule_date", "date": "2026-02-12"}
+        {"type": "interest", "screen": 4, "sleeping": false}
+        {"type": "gif_ack", "offset": 4096}
+        {"type": "gif_status", "transfer_id": "...", "hash": "...", "offset": 4096, "receiving": true}
+        {"type": "gif_ready", "status": "success"}
         """
-        self.last_message = raw_msg
-
         try:
             data = json.loads(raw_msg)
         except json.JSONDecodeError:
             # Игнорируем не-JSON сообщения
+            self.last_message = raw_msg
             return
 
         msg_type = data.get("type")
         action = data.get("action")
 
-        if msg_type == "pc_load":
-            if action == "start":
-                await self._start_pc_load()
-            elif action == "stop":
-                await self._stop_pc_load()
+        # Подтверждения GIF идут на каждый чанк и не должны затирать last_message.
+        if msg_type == "gif_ack":
+            self._on_gif_ack(data)
+            return
+        if msg_type == "gif_status":
+            future = self._gif_status_future
+            if future is not None and not future.done():
+                future.set_result(data)
+            return
+
+        self.last_message = raw_msg
+
+        if msg_type == "gif_ready":
+            future = self._gif_ready_future
+            if future is not None and not future.done():
+                future.set_result(data)
+        elif msg_type == "interest":
+            await self._apply_interest(data)
+        elif msg_type == "pc_load":
+            if action == "history":
+                await self._send_pc_load_history(data)
+            elif not self.interest.declared:
+                # Без interest мониторингом управляют start/stop от прошивки
+                if action == "start":
+                    await self._start_pc_load()
+                elif action == "stop":
+                    await self._stop_pc_load()
         elif msg_type == "schedule_date":
             await self._handle_schedule_date(data)
 
+    async def _apply_interest(self, data: dict):
+        if not self.interest.update(data):
+            return
+        print(f"[ESP] interest: screen={self.interest.screen}, sleeping={self.interest.sleeping}")
+
+        if self.interest.wants("pc_load"):
+            await self._start_pc_load()
+        elif self._pc_load_subscription is not None:
+            await self._stop_pc_load()
+
+        for message in self.interest.take_visible():
+            await self.conn.broadcast_json(message)
+
+    async def _push(self, topic: str, message: dict, key: Optional[str] = None):
+        """Send `message` if the device can show `topic` now, otherwise hold it for backfill."""
+        if self.interest.wants(topic):
+            await self.conn.broadcast_json(message)
+        else:
+            self.interest.hold(topic, message, key)
+
     async def _handle_schedule_date(self, data: dict):
         """
         Обработка ответа вида:
@@ -210,31 +245,43 @@ class ESPService:
         await self._send_schedule(schedule_data)
 
     async def _start_pc_load(self):
-        if self._pc_load_running:
+        if self._pc_load_subscription is not None:
             return
-        self._pc_load_running = True
-        self._pc_load_task = asyncio.create_task(self._pc_load_loop())
+        # The screen was just opened: push the current load right away.
+        self.pc_load_policy.reset()
+        self._pc_load_subscription = get_telemetry_sampler().subscribe(
+            self._on_telemetry,
+            self.pc_load_policy.interval,
+        )
         print("PC load monitoring started")
 
     async def _stop_pc_load(self):
-        self._pc_load_running = False
-        if self._pc_load_task:
-            await self._pc_load_task
-            self._pc_load_task = None
+        subscription, self._pc_load_subscription = self._pc_load_subscription, None
+        if subscription is not None:
+            await get_telemetry_sampler().unsubscribe(subscription)
         print("PC load monitoring stopped")
 
-    async def _pc_load_loop(self):
-        while self._pc_load_running:
-            await asyncio.sleep(self._pc_load_interval)
+    async def _on_telemetry(self, sample: TelemetrySample):
+        send = self.pc_load_policy.should_send(sample)
+        if self._pc_load_subscription is not None:
+            get_telemetry_sampler().set_interval(self._pc_load_subscription, self.pc_load_policy.interval)
+        if send:
+            await self._send_pc_load(sample.cpu, sample.gpu, sample.ram)
 
-            cpu = psutil.cpu_percent(interval=None)
-            ram = psutil.virtual_memory().percent
-            gpu = self._get_gpu_load()
-
-            await self._send_pc_load(cpu, gpu, ram)
-
-    def _get_gpu_load(self) -> float:
-        return get_gpu_load_percent()
+    async def _send_pc_load_history(self, request: dict):
+        """
+        Отправка истории нагрузки одним сообщением:
+        {"type": "pc_load_history", "step": sec, "cpu": [int], "ram": [int], "gpu": [int]}
+        """
+        history = AppContext.telemetry_history
+        if history is None:
+            return
+        try:
+            window = max(10.0, min(7 * 86400.0, float(request.get("window", 3600))))
+            points = max(1, min(240, int(request.get("points", 60))))
+        except (TypeError, ValueError):
+            return
+        await self.conn.broadcast({"type": "pc_load_history", **history.downsample(window, points)})
 
     async def _send_pc_load(self, cpu: float, gpu: float, ram: float):
         """
@@ -254,13 +301,15 @@ class ESPService:
         })
 
     async def send_color(self, *, screen: str, element: str, color: str):
-        await self.conn.broadcast_json(
+        await self._push(
+            screen,
             {
                 "type": "set_color",
                 "screen": screen,
                 "element": element,
                 "color": color,
-            }
+            },
+            key=f"set_color:{screen}:{element}",
         )
 
     async def send_display_settings(self, payload: dict):
@@ -326,16 +375,20 @@ class ESPService:
         """
         Keep backward compatibility with current ESP firmware (`settings_update`)
         and also send display/backlight blocks as dedicated commands.
+
+        The commands are issued together so batching firmware gets one frame.
         """
-        await self.conn.broadcast_json({"type": "settings_update", "payload": settings})
+        commands = [self.conn.broadcast_json({"type": "settings_update", "payload": settings})]
 
         display_payload = settings.get("display")
         if isinstance(display_payload, dict):
-            await self.send_display_settings(display_payload)
+            commands.append(self.send_display_settings(display_payload))
 
         backlight_payload = settings.get("backlight")
         if isinstance(backlight_payload, dict):
-            await self.send_backlight_brightness(backlight_payload)
+            commands.append(self.send_backlight_brightness(backlight_payload))
+
+        await asyncio.gather(*commands)
 
     async def send_saved_interface_colors(self, settings: dict):
         ui_colors = settings.get("ui_colors", {})
@@ -360,28 +413,25 @@ class ESPService:
         if sent_count:
             print(f"[ESP] reapplied saved interface colors: {sent_count}")
 
-    async def send_ota_command(self, firmware_path: str):
-        path = Path(firmware_path)
-        if not path.exists() or not path.is_file():
-            raise FileNotFoundError(f"Firmware file not found: {firmware_path}")
-
-        checksum = hashlib.sha1()
-        with open(path, "rb") as f:
-            while True:
-                chunk = f.read(65536)
-                if not chunk:
-                    break
-                checksum.update(chunk)
+    async def send_ota_command(self, firmware_path: str, *, asset_base_url: str) -> FirmwareImage:
+        """
+        Register a firmware image and tell the device to download it from the
+        asset server. The firmware verifies the MD5 while flashing and uses
+        Range requests to continue an interrupted download.
+        """
+        image = await asyncio.to_thread(self.firmware_store.register, firmware_path)
 
         await self.conn.broadcast_json(
             {
-                "type": "ota_update",
-                "name": path.name,
-                "size": path.stat().st_size,
-                "sha1": checksum.hexdigest(),
-                "path": str(path),
+                "type": "ota",
+                "url": f"{asset_base_url.rstrip('/')}/assets/firmware/{image.key}.bin",
+                "md5": image.md5,
+                "sha1": image.sha1,
+                "size": image.size,
+                "name": image.name,
             }
         )
+        return image
 
     async def send_gif(
         self,
@@ -393,49 +443,384 @@ class ESPService:
         delay_ms: int = 200,
         chunk_size: int = 1024,
         chunk_delay_sec: float = 0.05,
-        progress_cb: Optional[Callable[[str, int, str], Awaitable[None]]] = None,
+        flow: str = "auto",
+        transport: str = "push",
+        asset_base_url: Optional[str] = None,
+        progress_cb: Optional[Callable[..., Awaitable[None]]] = None,
     ):
+        """
+        Send a GIF as raw RGB565 over the WebSocket.
+
+        With `transport="pull"` the converted binary is first completed in the
+        cache and the device is sent `set_gif` with a content-addressed `url`
+        under `asset_base_url` plus the binary's `md5`; it downloads the file
+        itself and reports progress with `gif_ack`. Firmware that cannot
+        download falls back to the WebSocket push below.
+
+        `flow` selects pacing: "ack" uses the device's `gif_ack` offsets with a
+        sliding window, "fixed" sleeps `chunk_delay_sec` between chunks, and
+        "auto" asks for acks and falls back to "fixed" on older firmware.
+
+        If the device drops mid-transfer, waits for it to reconnect and
+        continues from the offset it reports (or restarts on old firmware).
+        """
         async with self._gif_lock:
             if progress_cb:
                 await progress_cb("working", 5, "Подготовка GIF")
 
             gif_path = self._resolve_gif_path(name)
-            payload = build_rgb565_from_gif(
-                gif_path,
-                name=Path(name).name,
-                width=int(width),
-                height=int(height),
-                delay_ms=int(delay_ms),
-                remove_frames=remove_frames or [],
-            )
+            params = {
+                "width": int(width),
+                "height": int(height),
+                "remove_frames": remove_frames or [],
+            }
+            key = await asyncio.to_thread(self.gif_cache.make_key, gif_path, params)
+
+            pull_url = None
+            if transport == "pull":
+                if not asset_base_url:
+                    raise ValueError("asset_base_url is required for pull transport")
+                cached = await asyncio.to_thread(
+                    self._cache_gif,
+                    gif_path,
+                    key=key,
+                    name=Path(name).name,
+                    delay_ms=int(delay_ms),
+                    params=params,
+                )
+                if cached:
+                    pull_url = f"{asset_base_url.rstrip('/')}/assets/gif/{key}.bin"
+                else:
+                    print("[ESP] GIF is not cacheable, pushing it over WebSocket")
+
+            async def open_stream(offset: int) -> GifFrameStream:
+                return await asyncio.to_thread(
+                    self._open_gif_stream,
+                    gif_path,
+                    key=key,
+                    name=Path(name).name,
+                    delay_ms=int(delay_ms),
+                    params=params,
+                    offset=offset,
+                )
+
+            stream = await open_stream(0)
+            transfer = GifTransfer(transfer_id=uuid.uuid4().hex[:12], key=key, total_size=stream.total_size)
+            metadata = stream.metadata()
+            metadata["transfer_id"] = transfer.transfer_id
+            metadata["hash"] = key
+            if pull_url is not None:
+                metadata["url"] = pull_url
+                metadata["md5"] = await asyncio.to_thread(self.gif_cache.content_md5, key)
+
+            async def report(done: int, message: str | None = None):
+                if progress_cb:
+                    # 45..100 reserved for transfer progress.
+                    progress = 45 + int((done / max(transfer.total_size, 1)) * 55)
+                    await progress_cb(
+                        "working",
+                        min(progress, 99),
+                        message or f"Отправка GIF: {done}/{transfer.total_size} байт",
+                        **transfer.details(),
+                    )
 
             if progress_cb:
                 await progress_cb("working", 35, "Отправка метаданных GIF")
 
-            await self.conn.broadcast_json(payload.metadata())
-            await asyncio.sleep(0.6)
+            window = None
+            if flow in ("auto", "ack") or pull_url is not None:
+                window = AckWindow(initial_chunk=chunk_size)
+                metadata["flow"] = "ack"
+                self._gif_window = window
+            self._gif_pull_accepted = False
+            if pull_url is not None:
+                self._gif_ready_future = asyncio.get_running_loop().create_future()
+
+            try:
+                # The device answers `set_gif` with offset 0 once the file is open.
+                acked = await self._announce_gif(metadata, window)
+                if pull_url is not None and self._gif_pull_accepted:
+                    if progress_cb:
+                        await progress_cb("working", 45, "ESP загружает GIF по HTTP")
+                    started = asyncio.get_running_loop().time()
+                    await self._wait_gif_pulled(window, transfer, report)
+                    elapsed = max(asyncio.get_running_loop().time() - started, 1e-6)
+                    print(
+                        f"[ESP] GIF pulled: {transfer.total_size} bytes in {elapsed:.2f}s "
+                        f"({transfer.total_size / elapsed / 1024:.1f} KiB/s)"
+                    )
+                    if progress_cb:
+                        await progress_cb("done", 100, "GIF отправлена", **transfer.details())
+                    return
+
+                if pull_url is not None:
+                    print("[ESP] Firmware cannot download GIFs, pushing over WebSocket")
+                    metadata.pop("url", None)
+                    metadata.pop("md5", None)
+
+                if window is not None and not acked:
+                    if flow == "ack":
+                        raise TimeoutError("Device did not acknowledge GIF metadata")
+                    print("[ESP] GIF acks not supported by firmware, using fixed delay")
+                    window = None
+                    self._gif_window = None
 
-            total = payload.total_size or 1
-            sent = 0
+                if progress_cb:
+                    await progress_cb("working", 45, "Отправка GIF на устройство")
+
+                started = asyncio.get_running_loop().time()
+                while True:
+                    try:
+                        if window is not None:
+                            await self._send_gif_windowed(stream, window, transfer, report)
+                        else:
+                            await self._send_gif_fixed(stream, chunk_size, chunk_delay_sec, transfer, report)
+                        break
+                    except (ConnectionError, ConnectionClosed) as e:
+                        transfer.resumes += 1
+                        if transfer.resumes > self.GIF_MAX_RESUMES:
+                            raise
+                        print(f"[ESP] GIF transfer {transfer.transfer_id} interrupted at {transfer.sent} bytes: {e}")
+                        await report(transfer.sent, "Связь с ESP потеряна, ожидание переподключения")
+
+                        offset = await self._resume_gif(transfer, metadata, window)
+                        transfer.retried_bytes += max(0, transfer.sent - offset)
+                        transfer.resumed_bytes += offset
+                        transfer.sent = offset
+                        stream = await open_stream(offset)
+                        print(f"[ESP] GIF transfer {transfer.transfer_id} continues from {offset} bytes")
+
+                elapsed = max(asyncio.get_running_loop().time() - started, 1e-6)
+                print(
+                    f"[ESP] GIF sent: {transfer.total_size} bytes in {elapsed:.2f}s "
+                    f"({transfer.total_size / elapsed / 1024:.1f} KiB/s, "
+                    f"flow={window.stats() if window else 'fixed'}, {transfer.details()})"
+                )
+            finally:
+                self._gif_window = None
+                self._gif_ready_future = None
 
             if progress_cb:
-                await progress_cb("working", 45, "Отправка GIF на устройство")
+                await progress_cb("done", 100, "GIF отправлена", **transfer.details())
 
-            for i in range(0, len(payload.data), max(1, int(chunk_size))):
-                chunk = payload.data[i:i + int(chunk_size)]
-                await self.conn.broadcast_bytes(chunk)
-                sent += len(chunk)
+    async def _announce_gif(self, metadata: dict, window: Optional[AckWindow]) -> bool:
+        """Send `set_gif`; with a window, return whether the device acknowledged it."""
+        if window is None:
+            await self.conn.broadcast_json(metadata)
+            await asyncio.sleep(0.6)
+            return False
 
-                # 45..100 reserved for transfer progress.
-                progress = 45 + int((sent / total) * 55)
-                if progress_cb:
-                    await progress_cb("working", min(progress, 99), f"Отправка GIF: {sent}/{total} байт")
+        window.restart(0)
+        self._gif_ack_event.clear()
+        await self.conn.broadcast_json(metadata)
+        try:
+            await asyncio.wait_for(self._gif_ack_event.wait(), 0.6)
+        except asyncio.TimeoutError:
+            pass
+        return window.acks > 0
+
+    async def _resume_gif(self, transfer: GifTransfer, metadata: dict, window: Optional[AckWindow]) -> int:
+        """Wait for the device to come back and return the offset to continue from."""
+        deadline = asyncio.get_running_loop().time() + self.GIF_RESUME_WAIT_SEC
+        while not self.is_connected():
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError("ESP did not reconnect to resume GIF transfer")
+            await asyncio.sleep(0.5)
+
+        if window is not None:
+            status = await self._query_gif_status()
+            if (
+                status is not None
+                and status.get("transfer_id") == transfer.transfer_id
+                and status.get("hash") == transfer.key
+                and bool(status.get("receiving"))
+            ):
+                try:
+                    offset = max(0, min(int(status.get("offset", 0)), transfer.total_size))
+                except (TypeError, ValueError):
+                    offset = 0
+                window.restart(offset)
+                self._gif_ack_event.clear()
+                await self.conn.broadcast_json(
+                    {"type": "gif_resume", "transfer_id": transfer.transfer_id, "offset": offset}
+                )
+                try:
+                    await asyncio.wait_for(self._gif_ack_event.wait(), 2.0)
+                except asyncio.TimeoutError:
+                    pass
+                if window.acks > 0 and window.acked == offset:
+                    return offset
+
+        # The device lost the partial file (reboot, old firmware): start over.
+        acked = await self._announce_gif(metadata, window)
+        if window is not None and not acked:
+            raise TimeoutError("Device did not acknowledge restarted GIF transfer")
+        return 0
+
+    async def _query_gif_status(self) -> Optional[dict]:
+        future = asyncio.get_running_loop().create_future()
+        self._gif_status_future = future
+        try:
+            await self.conn.broadcast_json({"type": "gif_status"})
+            return await asyncio.wait_for(future, 3.0)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._gif_status_future = None
+
+    async def _send_gif_fixed(
+        self,
+        stream: GifFrameStream,
+        chunk_size: int,
+        chunk_delay_sec: float,
+        transfer: GifTransfer,
+        report,
+    ):
+        async with aclosing(self._iter_gif_chunks(stream, lambda: chunk_size)) as chunks:
+            async for chunk in chunks:
+                if not self.is_connected():
+                    raise ConnectionError("ESP disconnected")
+                await self.conn.broadcast_bytes(chunk)
+                transfer.sent += len(chunk)
+                await report(transfer.sent)
 
                 if chunk_delay_sec > 0:
                     await asyncio.sleep(chunk_delay_sec)
 
-            if progress_cb:
-                await progress_cb("done", 100, "GIF отправлена")
+    async def _send_gif_windowed(self, stream: GifFrameStream, window: AckWindow, transfer: GifTransfer, report):
+        loop = asyncio.get_running_loop()
+        async with aclosing(self._iter_gif_chunks(stream, lambda: window.chunk_size)) as chunks:
+            async for chunk in chunks:
+                while not window.can_send(transfer.sent):
+                    await self._wait_gif_ack(window)
+                if not self.is_connected():
+                    raise ConnectionError("ESP disconnected")
+                await self.conn.broadcast_bytes(chunk)
+                transfer.sent += len(chunk)
+                window.on_send(transfer.sent, loop.time())
+                await report(window.acked)
+
+        while window.acked < transfer.sent:
+            await self._wait_gif_ack(window)
+            await report(window.acked)
+
+    async def _wait_gif_pulled(self, window: AckWindow, transfer: GifTransfer, report):
+        """Follow the device's download progress until it reports `gif_ready`."""
+        ready = self._gif_ready_future
+        while not ready.done():
+            progress = asyncio.ensure_future(self._wait_gif_ack(window))
+            await asyncio.wait({progress, ready}, return_when=asyncio.FIRST_COMPLETED)
+            if progress.done():
+                progress.result()
+            else:
+                progress.cancel()
+            transfer.sent = window.acked
+            await report(window.acked)
+
+        result = ready.result()
+        if result.get("status") != "success":
+            raise RuntimeError(f"ESP failed to download GIF: {result.get('message') or result.get('status')}")
+
+    async def _wait_gif_ack(self, window: AckWindow):
+        stalled_since = asyncio.get_running_loop().time()
+        acked = window.acked
+        while window.acked == acked:
+            self._gif_ack_event.clear()
+            try:
+                await asyncio.wait_for(self._gif_ack_event.wait(), window.timeout)
+            except asyncio.TimeoutError:
+                if not self.is_connected():
+                    raise ConnectionError("ESP disconnected")
+                window.on_timeout()
+                if asyncio.get_running_loop().time() - stalled_since > self.GIF_ACK_STALL_SEC:
+                    raise TimeoutError(f"Device stopped acknowledging GIF data at {window.acked} bytes")
+
+    def _on_gif_ack(self, data: dict):
+        if data.get("pull"):
+            # Firmware confirms it is downloading the `url` from `set_gif` itself.
+            self._gif_pull_accepted = True
+        window = self._gif_window
+        if window is None:
+            return
+        try:
+            offset = int(data.get("offset", 0))
+        except (TypeError, ValueError):
+            return
+        window.on_ack(offset, asyncio.get_running_loop().time())
+        self._gif_ack_event.set()
+
+    def _open_gif_stream(
+        self,
+        gif_path: Path,
+        *,
+        key: str,
+        name: str,
+        delay_ms: int,
+        params: dict,
+        offset: int = 0,
+    ) -> GifFrameStream:
+        stream = self.gif_cache.open_stream(key, name=name, delay_ms=delay_ms, offset=offset)
+        if stream is not None:
+            print(f"[ESP] GIF cache hit: {name}")
+            return stream
+
+        stream = open_rgb565_stream(gif_path, name=name, delay_ms=delay_ms, **params)
+        stream = self.gif_cache.record(key, stream)
+        return stream.skip(offset) if offset else stream
+
+    def _cache_gif(self, gif_path: Path, *, key: str, name: str, delay_ms: int, params: dict) -> bool:
+        """Make sure the converted binary is committed to the cache; False if it cannot be."""
+        if self.gif_cache.entry_path(key) is not None:
+            return True
+
+        stream = self._open_gif_stream(gif_path, key=key, name=name, delay_ms=delay_ms, params=params)
+        for _chunk in stream.chunks:
+            pass
+        return self.gif_cache.entry_path(key) is not None
+
+    async def _iter_gif_chunks(self, stream: GifFrameStream, chunk_size: Callable[[], int]):
+        """
+        Yield `chunk_size()` slices of the animation while the next frame is
+        decoded in a worker thread, so encoding overlaps with the transfer and
+        only about one frame is held in memory at a time. The size is re-read
+        for every chunk so flow control can retune it mid-transfer.
+        """
+        frames = stream.chunks
+        pending = asyncio.ensure_future(asyncio.to_thread(next, frames, None))
+        buffer = bytearray()
+
+        try:
+            while True:
+                # Shielded: cancelling the transfer must not mark the prefetch
+                # done while its worker thread is still inside `frames`.
+                frame = await asyncio.shield(pending)
+                if frame is None:
+                    break
+                pending = asyncio.ensure_future(asyncio.to_thread(next, frames, None))
+
+                buffer += frame
+                offset = 0
+                size = max(1, int(chunk_size()))
+                while len(buffer) - offset >= size:
+                    yield bytes(buffer[offset:offset + size])
+                    offset += size
+                    size = max(1, int(chunk_size()))
+                del buffer[:offset]
+
+            if buffer:
+                yield bytes(buffer)
+        finally:
+            # A generator cannot be closed while a worker thread is inside it:
+            # let the in-flight next() finish and drop its frame first.
+            if not pending.done():
+                try:
+                    await asyncio.wait({pending})
+                except asyncio.CancelledError:
+                    pending.add_done_callback(lambda _f: frames.close())
+                    raise
+            if not pending.cancelled():
+                pending.exception()
+            frames.close()
 
     def _resolve_gif_path(self, name: str) -> Path:
         raw = Path(name)
@@ -453,12 +838,17 @@ class ESPService:
     async def on_volume(self, event):
         """
         Обработка события изменения громкости.
-        event: {"type": "volume", "value": int}
+        event: {"type": "volume", "value": int, "initial": bool}
         Отправляем: {"type": "volume", "value": int}
+
+        Прошивка на каждое сообщение показывает оверлей громкости, поэтому
+        стартовое значение (`initial`) на устройство не отправляем.
         """
+        if event.get("initial"):
+            return
         value = event.get("value")
         if value is not None:
-            await self.conn.broadcast({
+            await self._push("volume", {
                 "type": "volume",
                 "value": int(value)
             })
@@ -471,7 +861,7 @@ class ESPService:
         """
         name = event.get("name", "")
         author = event.get("author", "")
-        await self.conn.broadcast({
+        await self._push("music", {
             "type": "music",
             "name": str(name),
             "author": str(author)
@@ -503,7 +893,7 @@ class ESPService:
         Отправка расписания в формате:
         {"type": "schedule", "payload": dict}
         """
-        await self.conn.broadcast({
+        await self._push("schedule", {
             "type": "schedule",
             "payload": schedule_data
         })
@@ -7,14 +7,20 @@ if __package__ in (None, ""):
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
     from backend.api.http_server import APIServer
     from backend.core.alive_services import AppContext
+    from backend.core.history import TelemetryHistory
     from backend.core.lifecycle import boot
+    from backend.core.producers import ProducerManager
+    from backend.core.settings import get_settings_store
     from backend.esp.service import ESPService
     from backend.modules.music.service import MediaPlayerService
     from backend.modules.volume.service import VolumeService
 else:
     from .api.http_server import APIServer
     from .core.alive_services import AppContext
+    from .core.history import TelemetryHistory
     from .core.lifecycle import boot
+    from .core.producers import ProducerManager
+    from .core.settings import get_settings_store
     from .esp.service import ESPService
     from .modules.music.service import MediaPlayerService
     from .modules.volume.service import VolumeService
@@ -25,13 +31,20 @@ async def main():
 
     esp_service = ESPService(bus)
     api_server = APIServer()
+    media_service = MediaPlayerService(bus)
+    volume_service = VolumeService(bus)
+    telemetry_history = TelemetryHistory()
+    producers = ProducerManager(bus)
     AppContext.esp_service = esp_service
+    AppContext.telemetry_history = telemetry_history
+    AppContext.producers = producers
 
     services = [
-        MediaPlayerService(bus),
-        VolumeService(bus),
+        media_service,
+        volume_service,
         esp_service,
         api_server,
+        telemetry_history,
     ]
 
     tasks = []
@@ -40,6 +53,19 @@ async def main():
 
     await asyncio.gather(*tasks)
 
+    # Producers poll Windows and the network; run them only while a device listens.
+    # Telemetry history is not one: it feeds the PC UI and must not have gaps.
+    producers.register("media", resume=media_service.resume, suspend=media_service.suspend)
+    producers.register("volume", resume=volume_service.resume, suspend=volume_service.suspend)
+    producers.register("weather", resume=api_server.resume_weather, suspend=api_server.suspend_weather)
+    await producers.start()
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Settings are written behind; don't lose the last edits on exit.
+        await get_settings_store().flush()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
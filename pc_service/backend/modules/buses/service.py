@@ -5,16 +5,37 @@ from datetime import date, timedelta, datetime
 from backend.parsers.bus_shedule_parser import TransportScheduleParser
 from backend.core.network import has_internet
 from backend.core.paths import data_path
+from backend.core.settings import get_settings_store
 
 
 class BusService:
     SCHEDULE_PATH = data_path("backend", "storage", "schedule.json")
-    SETTINGS_PATH = data_path("backend", "storage", "settings.json")
 
     def __init__(self):
-        self.settings = self._load_settings()
-        self.time_interval = self.settings["bus_settings"]["time_interval"]
+        store = get_settings_store()
+        self._apply_schedule(store.snapshot()["schedule"])
         self.parser = TransportScheduleParser()
+        store.subscribe(self._on_settings_changed)
+
+    def _apply_schedule(self, schedule):
+        self.schedule = schedule
+        self.time_interval = {"start": schedule["start_time"], "end": schedule["end_time"]}
+        self.stops = [
+            {
+                "url": source["url"],
+                "stop_name": source["stop_name"],
+                "name": source["bus_number"] or source["stop_name"] or "Bus",
+            }
+            for source in schedule["sources"]
+            if source["url"]
+        ]
+
+    def _on_settings_changed(self, settings):
+        if settings["schedule"] == self.schedule:
+            return
+
+        self._apply_schedule(settings["schedule"])
+        asyncio.create_task(self.update_cache())
 
     async def update_cache(self):
         if not await has_internet():
@@ -31,7 +52,7 @@ class BusService:
             tasks = []
             meta = []  # <-- ЧТО именно мы парсим
 
-            for stop in self.settings["bus_settings"]["stops"]:
+            for stop in self.stops:
                 url = stop["url"]
                 name = stop["stop_name"]
                 bus_name = stop["name"]
@@ -75,13 +96,6 @@ class BusService:
 
         return schedule
 
-    def _load_settings(self) -> dict:
-        if not self.SETTINGS_PATH.exists():
-            raise FileNotFoundError("settings.json not found")
-
-        with open(self.SETTINGS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-
     def save_schedule(self, data: dict):
         self.SCHEDULE_PATH.parent.mkdir(parents=True, exist_ok=True)
         with open(self.SCHEDULE_PATH, "w", encoding="utf-8") as f:
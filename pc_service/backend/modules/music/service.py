@@ -1,34 +1,97 @@
 import asyncio
-from winsdk.windows.media.control import (
-    GlobalSystemMediaTransportControlsSessionManager as MediaManager
-)
+from typing import Optional
+
+from .sources import MediaSource
 
 
 class MediaPlayerService:
-    def __init__(self, bus, poll_interval=0.5):
+    """
+    Publishes `track_changed` when the current media session's track changes.
+
+    The source notifies on session and media-property changes. A track
+    switch arrives as several property events (title, artist, thumbnail...),
+    so the service waits until notifications have been quiet for
+    `debounce_sec` (but no longer than `max_delay_sec`) and then reads the
+    track once.
+    """
+
+    def __init__(
+        self,
+        bus,
+        source: Optional[MediaSource] = None,
+        *,
+        debounce_sec: float = 0.15,
+        max_delay_sec: float = 1.0,
+    ):
         self.bus = bus
-        self.poll_interval = poll_interval
+        if source is None:
+            from .sources import WindowsMediaSource
+
+            source = WindowsMediaSource()
+        self.source = source
+        self.debounce_sec = debounce_sec
+        self.max_delay_sec = max_delay_sec
         self._last_key = None
-        self._sessions = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.notifications = 0
+        self.reads = 0
 
-    async def start(self):
-        self._sessions = await MediaManager.request_async()
+    def _on_source_change(self):
+        self.notifications += 1
+        self._changed.set()
 
+    async def _settle(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay_sec
         while True:
-            session = self._sessions.get_current_session()
-            if session:
-                props = await session.try_get_media_properties_async()
+            self._changed.clear()
+            timeout = min(self.debounce_sec, deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return
+
+    async def start(self):
+        await self.resume()
+
+    async def resume(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
 
-                if props.title:
-                    key = (props.title, props.artist)
-                    if key != self._last_key:
-                        self._last_key = key
-                        await self.bus.publish("track_changed", {
-                            "name": props.title,
-                            "author": props.artist,
-                        })
+    async def suspend(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
-            await asyncio.sleep(self.poll_interval)
+    async def _run(self):
+        await self.source.start(self._on_source_change)
+        self._changed.set()
 
+        try:
+            while True:
+                await self._changed.wait()
+                await self._settle()
 
+                self.reads += 1
+                try:
+                    track = await self.source.current()
+                except Exception as e:
+                    print("Media session read failed:", e)
+                    continue
 
+                if track is not None and track != self._last_key:
+                    self._last_key = track
+                    name, author = track
+                    await self.bus.publish("track_changed", {
+                        "name": name,
+                        "author": author,
+                    })
+        finally:
+            self.source.close()
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+
+MediaCallback = Callable[[], None]
+Track = tuple[str, str]
+
+
+class MediaSource(ABC):
+    """
+    Where MediaPlayerService gets the current track from.
+
+    After `start(notify)` the source calls `notify()` on the event loop
+    thread whenever the session or its media properties may have changed;
+    the service then reads `current()`. Notifications carry no data because
+    players report one switch as several partial updates.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._notify: Optional[MediaCallback] = None
+
+    async def start(self, notify: MediaCallback):
+        self._loop = asyncio.get_running_loop()
+        self._notify = notify
+
+    def close(self):
+        self._notify = None
+
+    @abstractmethod
+    async def current(self) -> Optional[Track]:
+        """(title, artist) of the current session, or None."""
+
+    def _call_threadsafe(self, callback: Callable[[], None]):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(callback)
+
+    def _emit(self):
+        if self._notify is not None:
+            self._notify()
+
+
+class WindowsMediaSource(MediaSource):
+    """
+    Global System Media Transport Controls via winsdk, driven by the
+    CurrentSessionChanged and MediaPropertiesChanged events.
+
+    WinRT raises the events on thread-pool threads; handlers only hop to the
+    event loop, where the session subscription is swapped and the service
+    notified.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._manager = None
+        self._session_token = None
+        self._session = None
+        self._properties_token = None
+
+    async def start(self, notify: MediaCallback):
+        from winsdk.windows.media.control import (
+            GlobalSystemMediaTransportControlsSessionManager as MediaManager
+        )
+
+        await super().start(notify)
+        self._manager = await MediaManager.request_async()
+        self._session_token = self._manager.add_current_session_changed(
+            lambda _sender, _args: self._call_threadsafe(self._on_session_changed)
+        )
+        self._on_session_changed()
+
+    def _on_session_changed(self):
+        self._unwatch_session()
+        session = self._manager.get_current_session() if self._manager else None
+        if session is not None:
+            self._properties_token = session.add_media_properties_changed(
+                lambda _sender, _args: self._call_threadsafe(self._emit)
+            )
+            self._session = session
+        self._emit()
+
+    def _unwatch_session(self):
+        if self._session is not None and self._properties_token is not None:
+            try:
+                self._session.remove_media_properties_changed(self._properties_token)
+            except OSError:
+                pass
+        self._session = None
+        self._properties_token = None
+
+    def close(self):
+        self._unwatch_session()
+        if self._manager is not None and self._session_token is not None:
+            self._manager.remove_current_session_changed(self._session_token)
+            self._session_token = None
+        super().close()
+
+    async def current(self) -> Optional[Track]:
+        session = self._manager.get_current_session() if self._manager else None
+        if session is None:
+            return None
+        props = await session.try_get_media_properties_async()
+        if not props.title:
+            return None
+        return props.title, props.artist
+
+
+class FakeMediaSource(MediaSource):
+    """
+    Scriptable source for tests on any platform.
+
+    `set_track()` may be called from any thread and, like a real player,
+    reports the switch as `updates` separate notifications; `play()` replays
+    a script of (delay_sec, title, artist) steps from a thread.
+    """
+
+    def __init__(self, track: Optional[Track] = None):
+        super().__init__()
+        self._track = track
+        self.reads = 0
+
+    async def current(self) -> Optional[Track]:
+        self.reads += 1
+        return self._track
+
+    def set_track(self, title: str, artist: str, *, updates: int = 3):
+        self._track = (title, artist)
+        for _ in range(max(1, updates)):
+            self._call_threadsafe(self._emit)
+
+    def play(self, script: list[tuple[float, str, str]]) -> threading.Thread:
+        def run():
+            for delay, title, artist in script:
+                time.sleep(delay)
+                self.set_track(title, artist)
+
+        thread = threading.Thread(target=run, name="fake-media", daemon=True)
+        thread.start()
+        return thread
@@ -1,7 +1,4 @@
-import asyncio
-import psutil
-
-from backend.core.gpu import get_gpu_load_percent
+from backend.core.telemetry import TelemetrySample, get_telemetry_sampler
 
 
 class AsyncSystemMonitor:
@@ -19,35 +16,27 @@ class AsyncSystemMonitor:
         self.ram_spike = ram_spike
         self.gpu_spike = gpu_spike
 
-        self._prev_cpu = psutil.cpu_percent(interval=0)
-        self._prev_ram = psutil.virtual_memory().percent
-        self._prev_gpu = self._get_gpu_load()
-
-        self._running = False
-        self._task = None
+        # Baseline comes from the first sample delivered.
+        self._prev_cpu = None
+        self._prev_ram = None
+        self._prev_gpu = None
 
-    def _get_gpu_load(self):
-        return get_gpu_load_percent()
+        self._subscription = None
 
     async def start(self):
-        if self._running:
+        if self._subscription is not None:
             return
-        self._running = True
-        self._task = asyncio.create_task(self._loop())
+        self._subscription = get_telemetry_sampler().subscribe(self._on_sample, self.interval)
 
     async def stop(self):
-        self._running = False
-        if self._task:
-            await self._task
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            await get_telemetry_sampler().unsubscribe(subscription)
 
-    async def _loop(self):
-        while self._running:
-            await asyncio.sleep(self.interval)
-
-            cpu = psutil.cpu_percent(interval=None)
-            ram = psutil.virtual_memory().percent
-            gpu = self._get_gpu_load()
+    async def _on_sample(self, sample: TelemetrySample):
+        cpu, ram, gpu = sample.cpu, sample.ram, sample.gpu
 
+        if self._prev_cpu is not None:
             events = []
 
             if cpu - self._prev_cpu > self.cpu_spike:
@@ -67,8 +56,6 @@ class AsyncSystemMonitor:
 
                 await self.bus.publish("big_system_load", data)
 
-            self._prev_cpu = cpu
-            self._prev_ram = ram
-            self._prev_gpu = gpu
-
-   
+        self._prev_cpu = cpu
+        self._prev_ram = ram
+        self._prev_gpu = gpu
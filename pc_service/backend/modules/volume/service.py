@@ -1,34 +1,76 @@
 import asyncio
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+from typing import Optional
+
+from .sources import VolumeSource
 
 
 class VolumeService:
-    def __init__(self, bus, poll_interval=0.2):
+    """
+    Publishes `volume_changed` whenever the master volume changes.
+
+    Changes are pushed by the source, so an idle system costs nothing. A
+    burst of notifications (dragging the slider) is collapsed to the latest
+    value while the previous publish is in progress.
+    """
+
+    def __init__(self, bus, source: Optional[VolumeSource] = None):
         self.bus = bus
-        self.poll_interval = poll_interval
+        if source is None:
+            from .sources import WindowsVolumeSource
+
+            source = WindowsVolumeSource()
+        self.source = source
         self._last = None
+        self._pending = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
 
-        devices = AudioUtilities.GetSpeakers()
-        interface = devices.Activate(
-            IAudioEndpointVolume._iid_,
-            CLSCTX_ALL,
-            None
-        )
-        self.volume = cast(interface, POINTER(IAudioEndpointVolume))
+    def _on_source_change(self, value: int):
+        self._pending = value
+        self._changed.set()
 
     async def start(self):
-        self._last = int(self.volume.GetMasterVolumeLevelScalar() * 100)
+        await self.resume()
 
-        while True:
-            current = int(self.volume.GetMasterVolumeLevelScalar() * 100)
+    async def resume(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
 
+    async def suspend(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        self.source.start(self._on_source_change)
+
+        try:
+            # The first reading is published too, so the bus retains the current
+            # level. It is marked `initial`: nobody just moved the slider. An
+            # unchanged level after a resume is not published again.
+            current = self.source.current()
             if current != self._last:
                 self._last = current
                 await self.bus.publish("volume_changed", {
                     "type": "volume",
-                    "value": current
+                    "value": current,
+                    "initial": True,
                     })
 
-            await asyncio.sleep(self.poll_interval)
+            while True:
+                await self._changed.wait()
+                self._changed.clear()
+
+                current = self._pending
+                if current != self._last:
+                    self._last = current
+                    await self.bus.publish("volume_changed", {
+                        "type": "volume",
+                        "value": current
+                        })
+        finally:
+            self.source.close()
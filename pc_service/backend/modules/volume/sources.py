@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+
+VolumeCallback = Callable[[int], None]
+
+
+class VolumeSource(ABC):
+    """
+    Where VolumeService gets the master volume from.
+
+    `start(notify)` is called on the event loop; from then on the source
+    calls `notify(percent)` on the loop thread whenever the volume changes,
+    whatever thread the change was reported on.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._notify: Optional[VolumeCallback] = None
+
+    def start(self, notify: VolumeCallback):
+        self._loop = asyncio.get_running_loop()
+        self._notify = notify
+
+    def close(self):
+        self._notify = None
+
+    @abstractmethod
+    def current(self) -> int:
+        """Master volume in percent."""
+
+    def _emit_threadsafe(self, value: int):
+        loop, notify = self._loop, self._notify
+        if loop is None or notify is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(notify, value)
+
+
+class WindowsVolumeSource(VolumeSource):
+    """
+    Default speakers via pycaw, with changes pushed by an
+    IAudioEndpointVolumeCallback instead of polling.
+
+    Windows calls the callback on one of its own COM threads; the value is
+    handed to the event loop with `call_soon_threadsafe`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        from ctypes import POINTER, cast
+
+        from comtypes import CLSCTX_ALL, COMObject
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume, IAudioEndpointVolumeCallback
+
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        self.volume = cast(interface, POINTER(IAudioEndpointVolume))
+
+        source = self
+
+        class _Callback(COMObject):
+            _com_interfaces_ = [IAudioEndpointVolumeCallback]
+
+            def OnNotify(self, pNotify):
+                source._emit_threadsafe(int(pNotify.contents.fMasterVolume * 100))
+                return 0
+
+        # Must stay referenced for as long as it is registered.
+        self._callback = _Callback()
+        self._registered = False
+
+    def start(self, notify: VolumeCallback):
+        super().start(notify)
+        if not self._registered:
+            self.volume.RegisterControlChangeNotify(self._callback)
+            self._registered = True
+
+    def close(self):
+        if self._registered:
+            self.volume.UnregisterControlChangeNotify(self._callback)
+            self._registered = False
+        super().close()
+
+    def current(self) -> int:
+        return int(self.volume.GetMasterVolumeLevelScalar() * 100)
+
+
+class FakeVolumeSource(VolumeSource):
+    """
+    Scriptable source for tests and benchmarks on any platform.
+
+    `set()` may be called from any thread, like the Windows callback, and
+    `play()` replays a script of (delay_sec, percent) steps from a thread.
+    """
+
+    def __init__(self, initial: int = 50):
+        super().__init__()
+        self._value = int(initial)
+
+    def current(self) -> int:
+        return self._value
+
+    def set(self, value: int):
+        self._value = int(value)
+        self._emit_threadsafe(self._value)
+
+    def play(self, script: list[tuple[float, int]]) -> threading.Thread:
+        def run():
+            for delay, value in script:
+                time.sleep(delay)
+                self.set(value)
+
+        thread = threading.Thread(target=run, name="fake-volume", daemon=True)
+        thread.start()
+        return thread
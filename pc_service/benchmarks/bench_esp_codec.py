@@ -0,0 +1,121 @@
+"""
+Benchmark for the ESP command codecs.
+
+Compares the JSON and MessagePack encodings of the messages the backend
+sends most: `pc_load` samples, the bus `schedule` and `settings_update`.
+Prints the payload size and the encode and decode time of each, and checks
+that both round-trip to the same message (up to float32 precision for
+`pc_load`).
+
+The schedule comes from `backend/storage/schedule.json` when it exists and
+is generated otherwise.
+
+Run from `pc_service/`:
+    python benchmarks/bench_esp_codec.py
+"""
+
+import json
+import math
+import sys
+import time
+from copy import deepcopy
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import msgpack
+
+from backend.core.settings import DEFAULT_SETTINGS
+from backend.esp.codec import JSON_CODEC, MSGPACK_CODEC
+
+
+ROUNDS = 20000
+SCHEDULE_PATH = Path(__file__).resolve().parent.parent / "backend" / "storage" / "schedule.json"
+
+
+def pc_load_message() -> dict:
+    return {"type": "pc_load", "cpu": 23.7, "gpu": 41.0, "ram": 62.4}
+
+
+def generated_schedule() -> dict:
+    def stops(first_minute: int) -> list:
+        result = []
+        for index, name in enumerate(("M72", "144", "Т25", "904")):
+            minutes = range(first_minute + index * 3, 23 * 60, 7 + index)
+            result.append({
+                "stop_name": f"Остановка {index + 1}",
+                "name": name,
+                "times": [f"{m // 60:02d}:{m % 60:02d}" for m in minutes],
+            })
+        return result
+
+    return {"date": "2026-03-05", "today": stops(7 * 60 + 30), "tomorrow": stops(6 * 60)}
+
+
+def schedule_message() -> dict:
+    try:
+        payload = json.loads(SCHEDULE_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        payload = generated_schedule()
+    return {"type": "schedule", "payload": payload}
+
+
+def settings_message() -> dict:
+    settings = deepcopy(DEFAULT_SETTINGS)
+    settings["wifi"] = {"ssid": "HomeNetwork", "password": "correct horse battery"}
+    settings["ui_colors"] = {
+        "main": {"background": "#101418", "accent": "#FFAA00", "text": "#F0F0F0"},
+        "weather": {"background": "#0B1E2D", "text": "#E0F0FF"},
+    }
+    return {"type": "settings_update", "payload": settings}
+
+
+def decode_json(message: str) -> dict:
+    return json.loads(message)
+
+
+def decode_msgpack(message: bytes) -> dict:
+    return msgpack.unpackb(message, raw=False)
+
+
+def timed_us(fn, arg) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(arg)
+    return (time.perf_counter() - started) / ROUNDS * 1e6
+
+
+def same_message(left, right) -> bool:
+    if isinstance(left, float) or isinstance(right, float):
+        return math.isclose(left, right, rel_tol=1e-6)
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(same_message(left[k], right[k]) for k in left)
+    if isinstance(left, list):
+        return len(left) == len(right) and all(same_message(a, b) for a, b in zip(left, right))
+    return left == right
+
+
+def main():
+    cases = (
+        ("pc_load", pc_load_message()),
+        ("schedule", schedule_message()),
+        ("settings_update", settings_message()),
+    )
+
+    for label, message in cases:
+        as_json = JSON_CODEC.encode(message)
+        as_msgpack = MSGPACK_CODEC.encode(message)
+        if not same_message(decode_json(as_json), message) or not same_message(decode_msgpack(as_msgpack), message):
+            raise SystemExit(f"{label}: codec round-trip differs from the original message")
+
+        json_size = len(as_json.encode("utf-8"))
+        msgpack_size = len(as_msgpack)
+        print(
+            f"{label:<16} size {json_size:7d} B -> {msgpack_size:7d} B ({msgpack_size / json_size:4.0%})  "
+            f"encode {timed_us(JSON_CODEC.encode, message):8.2f}us -> {timed_us(MSGPACK_CODEC.encode, message):8.2f}us  "
+            f"decode {timed_us(decode_json, as_json):8.2f}us -> {timed_us(decode_msgpack, as_msgpack):8.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
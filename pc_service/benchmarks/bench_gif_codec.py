@@ -0,0 +1,110 @@
+"""
+Benchmark for the RGB565 GIF encoder.
+
+Compares the batched `build_rgb565_from_gif` against the previous per-pixel
+loop on synthetic GIFs and checks that both produce identical bytes. The
+`encode` columns time only the RGB565 step on already resized frames; the
+`full` columns include decoding, enhancement and resizing.
+
+Run from `pc_service/`:
+    python benchmarks/bench_gif_codec.py
+"""
+
+import struct
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageEnhance, ImageOps
+
+from backend.esp.gif_codec import build_rgb565_from_gif, encode_rgb565_frame
+
+
+CASES = (
+    # (label, source size, frames, output size)
+    ("150 frames 80x80", (160, 160), 150, (80, 80)),
+    ("60 frames 240x240", (480, 480), 60, (240, 240)),
+    ("20 frames 480x480", (480, 480), 20, (480, 480)),
+)
+
+
+def make_gif(path: Path, size: tuple[int, int], frames: int):
+    images = []
+    for index in range(frames):
+        noise = Image.effect_noise(size, 64 + (index % 32)).convert("RGB")
+        tint = Image.new("RGB", size, ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256))
+        images.append(Image.blend(noise, tint, 0.5).convert("P", palette=Image.Palette.ADAPTIVE))
+    images[0].save(path, save_all=True, append_images=images[1:], duration=100, loop=0)
+
+
+def prepared_frames(gif_path: Path, width: int, height: int) -> list:
+    frames = []
+    with Image.open(gif_path) as img:
+        for frame_index in range(getattr(img, "n_frames", 1)):
+            img.seek(frame_index)
+            frame = img.convert("RGBA")
+            background = Image.new("RGBA", frame.size, (0, 0, 0, 255))
+            frame = Image.alpha_composite(background, frame).convert("RGB")
+            frame = ImageEnhance.Contrast(frame).enhance(1.45)
+            frame = ImageEnhance.Brightness(frame).enhance(1.20)
+            frames.append(ImageOps.fit(frame, (width, height), Image.Resampling.LANCZOS))
+    return frames
+
+
+def legacy_encode(frames: list) -> bytes:
+    """Per-pixel encoder that `build_rgb565_from_gif` used before batching."""
+    raw = bytearray()
+    for frame in frames:
+        for r, g, b in frame.getdata():
+            rgb565 = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+            raw.extend(struct.pack("<H", rgb565))
+    return bytes(raw)
+
+
+def batched_encode(frames: list) -> bytes:
+    return b"".join(encode_rgb565_frame(frame) for frame in frames)
+
+
+def legacy_rgb565_from_gif(gif_path: Path, width: int, height: int) -> bytes:
+    return legacy_encode(prepared_frames(gif_path, width, height))
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, source_size, frames, (width, height) in CASES:
+            gif_path = Path(tmp) / "bench.gif"
+            make_gif(gif_path, source_size, frames)
+
+            frames_rgb = prepared_frames(gif_path, width, height)
+            legacy_raw, legacy_encode_sec = timed(legacy_encode, frames_rgb)
+            batched_raw, batched_encode_sec = timed(batched_encode, frames_rgb)
+
+            legacy, legacy_sec = timed(legacy_rgb565_from_gif, gif_path, width, height)
+            payload, batched_sec = timed(build_rgb565_from_gif, gif_path, width=width, height=height)
+
+            if batched_raw != legacy_raw or payload.data != legacy:
+                raise SystemExit(f"{label}: batched output differs from legacy encoder")
+
+            print(
+                f"{label:<20} {payload.total_size / 1024:9.1f} KiB  "
+                f"encode {legacy_encode_sec:7.3f}s -> {batched_encode_sec:7.3f}s "
+                f"(x{legacy_encode_sec / max(batched_encode_sec, 1e-9):.0f})  "
+                f"full {legacy_sec:7.3f}s -> {batched_sec:7.3f}s "
+                f"(x{legacy_sec / max(batched_sec, 1e-9):.1f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Loopback benchmark for GIF transfer pacing.
+
+Runs `ESPService.send_gif` against an emulated device over a real WebSocket
+on 127.0.0.1 and reports the achieved throughput for the fixed-delay and the
+ack-windowed flow modes. The emulated device stores data at `--flash-kbps`
+and delays every acknowledgement by `--link-ms` to mimic Wi-Fi latency.
+
+Run from `pc_service/`:
+    python benchmarks/bench_gif_transfer.py
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets
+from PIL import Image
+
+from backend.esp.gif_cache import GifConversionCache
+from backend.esp.service import ESPService
+
+
+def make_gif(path: Path, frames: int):
+    images = [Image.effect_noise((80, 80), 40 + i % 40).convert("P") for i in range(frames)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=100, loop=0)
+
+
+async def emulated_device(uri: str, flash_bps: float, link_sec: float, done: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    async with websockets.connect(uri, max_size=None) as ws:
+        total = 0
+        received = 0
+        ack = False
+
+        def send_ack(offset: int):
+            message = json.dumps({"type": "gif_ack", "offset": offset}, separators=(",", ":"))
+            loop.call_later(link_sec, lambda: asyncio.ensure_future(ws.send(message)))
+
+        async for message in ws:
+            if isinstance(message, str):
+                data = json.loads(message)
+                if data.get("type") == "set_gif":
+                    total = int(data["total_size"])
+                    received = 0
+                    ack = data.get("flow") == "ack"
+                    if ack:
+                        send_ack(0)
+                continue
+
+            # LittleFS write cost.
+            await asyncio.sleep(len(message) / flash_bps)
+            received += len(message)
+            if ack:
+                send_ack(received)
+            if received >= total:
+                done.set()
+
+
+async def run_mode(service: ESPService, gif_path: Path, flow: str, args) -> float:
+    done = asyncio.Event()
+
+    async def handler(ws):
+        service.conn.add_client(ws)
+        try:
+            async for message in ws:
+                await service.on_message(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            await service.conn.remove_client(ws)
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        device = asyncio.create_task(
+            emulated_device(f"ws://127.0.0.1:{port}", args.flash_kbps * 1024, args.link_ms / 1000, done)
+        )
+        while not service.conn.clients:
+            await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        await service.send_gif(name=str(gif_path), flow=flow, chunk_delay_sec=0.05)
+        await done.wait()
+        elapsed = time.perf_counter() - started
+        device.cancel()
+        try:
+            await device
+        except asyncio.CancelledError:
+            pass
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--flash-kbps", type=float, default=400.0)
+    parser.add_argument("--link-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gif_path = Path(tmp) / "bench.gif"
+        make_gif(gif_path, args.frames)
+
+        service = ESPService(bus=None)
+        service.gif_cache = GifConversionCache(Path(tmp) / "cache")
+        total = args.frames * 80 * 80 * 2
+
+        for flow in ("fixed", "ack"):
+            elapsed = await run_mode(service, gif_path, flow, args)
+            print(f"{flow:<6} {total / 1024:7.1f} KiB in {elapsed:6.2f}s  {total / elapsed / 1024:8.1f} KiB/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
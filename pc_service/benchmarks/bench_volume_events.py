@@ -0,0 +1,103 @@
+"""
+Benchmark for volume change notifications.
+
+Drives `VolumeService` from a `FakeVolumeSource` whose changes are fired
+from a separate thread, like the Windows endpoint callback, and compares it
+with the previous 0.2 s polling loop on the same script. Reports the delay
+from a change to its `volume_changed` publish, and how often each variant
+touched the volume API while idle.
+
+Run from `pc_service/`:
+    python benchmarks/bench_volume_events.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.modules.volume.service import VolumeService
+from backend.modules.volume.sources import FakeVolumeSource
+
+
+CHANGES = 20
+CHANGE_GAP_SEC = 0.13
+IDLE_SEC = 2.0
+POLL_INTERVAL_SEC = 0.2
+
+
+class CountingSource(FakeVolumeSource):
+    def __init__(self, initial: int = 50):
+        super().__init__(initial)
+        self.reads = 0
+        self.changed_at: dict[int, float] = {}
+
+    def current(self) -> int:
+        self.reads += 1
+        return super().current()
+
+    def set(self, value: int):
+        self.changed_at[value] = time.perf_counter()
+        super().set(value)
+
+
+class RecordingBus:
+    def __init__(self):
+        self.published_at: dict[int, float] = {}
+
+    async def publish(self, event_type: str, event: dict):
+        self.published_at[event["value"]] = time.perf_counter()
+
+
+async def legacy_polling(bus, source: FakeVolumeSource):
+    """The loop `VolumeService.start` ran before change notifications."""
+    last = source.current()
+    while True:
+        current = source.current()
+        if current != last:
+            last = current
+            await bus.publish("volume_changed", {"type": "volume", "value": current})
+        await asyncio.sleep(POLL_INTERVAL_SEC)
+
+
+async def run(label: str, make_task):
+    source = CountingSource()
+    bus = RecordingBus()
+    task = make_task(bus, source)
+    await asyncio.sleep(0.05)
+
+    reads_before = source.reads
+    await asyncio.sleep(IDLE_SEC)
+    idle_reads = source.reads - reads_before
+
+    values = [51 + i for i in range(CHANGES)]
+    await asyncio.to_thread(source.play([(CHANGE_GAP_SEC, v) for v in values]).join)
+    await asyncio.sleep(POLL_INTERVAL_SEC * 2)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    delays = [
+        (bus.published_at[v] - source.changed_at[v]) * 1000
+        for v in values
+        if v in bus.published_at
+    ]
+    print(
+        f"{label:<8} published {len(delays):2d}/{CHANGES}  "
+        f"delay avg {statistics.mean(delays):7.2f} ms  max {max(delays):7.2f} ms  "
+        f"idle reads {idle_reads / IDLE_SEC:4.1f}/s"
+    )
+
+
+async def main():
+    await run("polling", lambda bus, source: asyncio.create_task(legacy_polling(bus, source)))
+    await run("push", lambda bus, source: asyncio.create_task(VolumeService(bus, source).start()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())